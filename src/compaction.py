@@ -0,0 +1,366 @@
+"""
+This module provides a compaction job for the OpenCost parquet export.
+
+It merges the small parquet files of a day's partition into size-targeted, sorted,
+zstd compressed files, using the configured storage backend.
+"""
+
+from datetime import datetime, timezone
+import os
+import sys
+import tempfile
+import uuid
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datasets import get_dataset_config
+from manifest import ManifestError, live_files, new_manifest, read_manifest, write_manifest
+from opencost_parquet_exporter import get_config
+from query_index import file_entry
+from storage_factory import get_storage
+
+COMPACTED_FILE_PREFIX = 'part-'
+
+
+def get_compaction_config(target_size=None, sort_by=None, **kwargs):
+    """
+    Get configuration for the compaction job based on either provided
+    parameters or environment variables.
+
+    Parameters:
+    - target_size (int): Target size in bytes of the compacted files,
+                         defaults to the 'OPENCOST_PARQUET_COMPACTION_TARGET_SIZE'
+                         environment variable, or 134217728 (128 MiB) if not set.
+    - sort_by (str): Columns used to sort the compacted data, separated by commas,
+                     defaults to the 'OPENCOST_PARQUET_COMPACTION_SORT_BY' environment
+                     variable, or 'properties.namespace,properties.pod,window.start'.
+    - kwargs: Parameters passed to get_config, e.g. window_start.
+
+    Returns:
+    - dict: The export configuration with 'compaction_target_size' and
+            'compaction_sort_by'.
+    """
+    config = get_config(**kwargs)
+    if target_size is None:
+        target_size = int(os.environ.get(
+            'OPENCOST_PARQUET_COMPACTION_TARGET_SIZE', 128 * 1024 * 1024))
+    if sort_by is None:
+        sort_by = os.environ.get(
+            'OPENCOST_PARQUET_COMPACTION_SORT_BY',
+            'properties.namespace,properties.pod,window.start')
+    config['compaction_target_size'] = target_size
+    config['compaction_sort_by'] = [column for column in sort_by.split(',') if column]
+    return config
+
+
+def spool_file(data):
+    """
+    Writes the content of a downloaded file to a local temporary file, so it is not
+    kept in memory until it is merged.
+
+    Parameters:
+    - data (bytes): The content of the file.
+
+    Returns:
+    - file: The temporary file, rewound.
+    """
+    spooled = tempfile.TemporaryFile()
+    spooled.write(data)
+    spooled.seek(0)
+    return spooled
+
+
+def unify_schemas(sources):
+    """
+    Builds the schema of the compacted data from the footers of the parquet files.
+
+    Parameters:
+    - sources (list): The parquet files, as file objects.
+
+    Returns:
+    - pa.Schema: The union of the columns of the files, without the pandas index
+                 written by DataFrame.to_parquet, nor its metadata.
+    """
+    schemas = []
+    for source in sources:
+        schema = pq.read_schema(source)
+        source.seek(0)
+        schemas.append(pa.schema(
+            [field for field in schema if not field.name.startswith('__index_level_')]))
+    return pa.unify_schemas(schemas, promote_options='permissive')
+
+
+def read_files(sources, schema):
+    """
+    Reads the parquet files batch by batch.
+
+    Parameters:
+    - sources (list): The parquet files, as file objects.
+    - schema (pa.Schema): The schema of the compacted data, from unify_schemas.
+
+    Yields:
+    - pa.Table: A batch of a file, with the columns of the schema. Columns missing
+                from the file are null.
+    """
+    for source in sources:
+        for batch in pq.ParquetFile(source).iter_batches():
+            table = pa.Table.from_batches([batch])
+            for field in schema:
+                if field.name not in table.column_names:
+                    table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+            yield table.select(schema.names).cast(schema)
+
+
+def iter_row_groups(tables, target_size):
+    """
+    Regroups batches into row groups of about target_size bytes of uncompressed data.
+
+    Parameters:
+    - tables (iterable): The batches, as pa.Table.
+    - target_size (int): Target size in bytes of every row group.
+
+    Yields:
+    - pa.Table: The data of a row group.
+    """
+    chunk, chunk_bytes = [], 0
+    for table in tables:
+        bytes_per_row = max(1, table.nbytes // max(1, table.num_rows))
+        offset = 0
+        while offset < table.num_rows:
+            rows = max(1, -(-(target_size - chunk_bytes) // bytes_per_row))
+            chunk.append(table.slice(offset, rows))
+            chunk_bytes += chunk[-1].num_rows * bytes_per_row
+            offset += rows
+            if chunk_bytes >= target_size:
+                yield pa.concat_tables(chunk)
+                chunk, chunk_bytes = [], 0
+    if chunk:
+        yield pa.concat_tables(chunk)
+
+
+def write_files(row_groups, schema, target_size, sort_keys=()):
+    """
+    Writes row groups into zstd compressed parquet files of about target_size bytes.
+    Row groups hold about target_size bytes of uncompressed data, so every file is
+    closed after one or a few row groups.
+
+    Parameters:
+    - row_groups (iterable): The data of every row group, as pa.Table.
+    - schema (pa.Schema): The schema of the data.
+    - target_size (int): Target size in bytes of every file.
+    - sort_keys (list): Keys the rows of every row group are sorted by, see
+                        pa.Table.sort_by.
+
+    Returns:
+    - list: The files, as temporary files rewound.
+    """
+    files = []
+    writer = None
+    for row_group in row_groups:
+        if sort_keys:
+            row_group = row_group.sort_by(sort_keys)
+        if writer is None:
+            files.append(tempfile.TemporaryFile())
+            writer = pq.ParquetWriter(files[-1], schema, compression='zstd')
+        writer.write_table(row_group, row_group_size=max(1, row_group.num_rows))
+        if files[-1].tell() >= target_size:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+    for file in files:
+        file.seek(0)
+    return files
+
+
+def merge_files(storage, config, file_names, spooled):
+    """
+    Merges parquet files of the partition into compacted files, streaming their data
+    so only a row group at a time is held in memory.
+
+    Parameters:
+    - storage (BaseStorage): The storage backend.
+    - config (dict): Configuration dictionary from get_compaction_config.
+    - file_names (list): Names of the parquet files to merge.
+    - spooled (dict): Files that were already downloaded, by name, see spool_file.
+
+    Returns:
+    - list or None: The compacted files, as returned by write_files, or None if a
+                    file could not be read.
+    """
+    sources = []
+    try:
+        for file_name in file_names:
+            source = spooled.pop(file_name, None)
+            if source is None:
+                data = storage.read_file(file_name, config)
+                if data is None:
+                    return None
+                source = spool_file(data)
+            sources.append(source)
+        schema = unify_schemas(sources)
+        sort_keys = [(column, 'ascending')
+                     for column in config['compaction_sort_by'] if column in schema.names]
+        target_size = config['compaction_target_size']
+        return write_files(iter_row_groups(read_files(sources, schema), target_size),
+                           schema, target_size, sort_keys)
+    finally:
+        for source in sources:
+            source.close()
+
+
+def save_files(storage, config, names, files):
+    """
+    Saves the compacted files in the partition.
+
+    Parameters:
+    - storage (BaseStorage): The storage backend.
+    - config (dict): Configuration dictionary from get_compaction_config.
+    - names (list): Names of the files.
+    - files (list): The files, as returned by write_files.
+
+    Returns:
+    - list or None: The manifest entries of the files, or None if a file could not be saved.
+    """
+    entries = []
+    for name, file in zip(names, files):
+        size = file.seek(0, os.SEEK_END)
+        file.seek(0)
+        if storage.save_file(file, name, config) is None:
+            print(f"Failed to save {name}, aborting compaction.")
+            return None
+        file.seek(0)
+        parquet_file = pq.ParquetFile(file)
+        if config['index']:
+            entry = file_entry(name, parquet_file, config)
+        else:
+            entry = {'name': name, 'rows': parquet_file.metadata.num_rows}
+        entries.append(dict(entry, size=size))
+    return entries
+
+
+def merged_windows(entries):
+    """
+    Returns the export windows of compacted files.
+
+    Parameters:
+    - entries (list): Manifest entries of the merged files.
+
+    Returns:
+    - list or None: The windows of the merged files, or None if a file has no windows,
+                    i.e. holds the whole day.
+    """
+    windows = set()
+    for entry in entries:
+        if not entry.get('windows'):
+            return None
+        windows.update(entry['windows'])
+    return sorted(windows)
+
+
+# pylint: disable=R0911,R0912,R0914,R0915
+def compact_partition(storage, config):
+    """
+    Compacts the parquet files of the partition of config['window_start'].
+
+    Small files are merged and rewritten as new files, streamed through local temporary
+    files, with the rows of every row group sorted. The new files are
+    recorded as pending in the manifest before they are written, then made live by
+    writing the manifest again, and the replaced files are deleted. Files of an
+    unfinished compaction are only deleted if they were recorded as pending.
+
+    Parameters:
+    - storage (BaseStorage): The storage backend.
+    - config (dict): Configuration dictionary from get_compaction_config.
+
+    Returns:
+    - dict or None: The new manifest, or None if the compaction failed.
+    """
+    file_names = storage.list_files(config)
+    try:
+        manifest = read_manifest(storage, config, file_names) or new_manifest()
+    except ManifestError as err:
+        print(f"{err}, aborting compaction.")
+        return None
+    live = live_files(manifest, file_names)
+    entries = {entry['name']: entry for entry in manifest['files']}
+    sizes = {name: entries.get(name, {}).get('size') for name in live}
+    spooled = {}
+    try:
+        for name in live:
+            if sizes[name] is None:
+                data = storage.read_file(name, config)
+                if data is None:
+                    return None
+                sizes[name] = len(data)
+                if sizes[name] < config['compaction_target_size']:
+                    spooled[name] = spool_file(data)
+        small = [name for name in live if sizes[name] < config['compaction_target_size']]
+        kept = [name for name in live if name not in small]
+        # Files replaced by a previous compaction, or written by a compaction that did
+        # not finish, are not part of the data anymore.
+        stale = [name for name in file_names
+                 if name.endswith('.parquet') and name not in live]
+
+        if len(small) > 1:
+            print(f"Compacting {len(small)} files")
+            files = merge_files(storage, config, small, spooled)
+            if files is None:
+                return None
+            run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+            names = [f"{COMPACTED_FILE_PREFIX}{run_id}-{index:05d}.parquet"
+                     for index in range(len(files))]
+            manifest['pending'] = manifest['pending'] + names
+            if write_manifest(manifest, storage, config) is None:
+                print("Failed to save the manifest, aborting compaction.")
+                return None
+            new_entries = save_files(storage, config, names, files)
+            for file in files:
+                file.close()
+            if new_entries is None:
+                return None
+            windows = merged_windows([entries.get(name, {}) for name in small])
+            if windows is not None:
+                new_entries = [dict(entry, windows=windows) for entry in new_entries]
+            manifest['files'] = [
+                entries.get(name, {'name': name, 'size': sizes[name]}) for name in kept
+            ] + new_entries
+            manifest['replaced'] = sorted(set(manifest['replaced']) | set(small))
+            manifest['pending'] = [name for name in manifest['pending'] if name not in names]
+            if write_manifest(manifest, storage, config) is None:
+                print("Failed to save the manifest, aborting compaction.")
+                return None
+            stale += small
+        else:
+            print("Nothing to compact")
+    finally:
+        for file in spooled.values():
+            file.close()
+
+    deleted = {name for name in stale if storage.delete_file(name, config)}
+    # Pending files that were never written are not pending anymore.
+    pending = [name for name in manifest['pending']
+               if name in file_names and name not in deleted]
+    if deleted or pending != manifest['pending']:
+        print(f"Deleted {len(deleted)} replaced files")
+        manifest['replaced'] = [name for name in manifest['replaced'] if name not in deleted]
+        manifest['pending'] = pending
+        write_manifest(manifest, storage, config)
+    return manifest
+
+# pylint: disable=C0116
+
+
+def main():
+    print("Starting compaction")
+    config = get_compaction_config()
+    storage = get_storage(storage_backend=config['storage_backend'])
+    for dataset in config['datasets']:
+        print(f"Compacting {dataset} partition")
+        manifest = compact_partition(storage, get_dataset_config(config, dataset))
+        if manifest is None:
+            sys.exit(1)
+        print(f"Partition has {len(manifest['files'])} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+This module provides the definitions of the datasets exported from OpenCost.
+
+Each dataset has its own API endpoint, query parameters, flatten rules and output
+location, and goes through the same fetch, process and save pipeline.
+"""
+
+from datetime import datetime, timedelta
+import os
+import re
+
+# Flatten rules are JSON files next to this module, in the same format as the
+# allocation ones.
+DATASETS = {
+    'allocation': {
+        'endpoint': '/allocation/compute',
+        'file_name': 'k8s_opencost.parquet',
+        'data_types': 'data_types.json',
+        'rename_cols': 'rename_cols.json',
+        'ignore_keys': 'ignore_alloc_keys.json',
+        'derived_cols': 'derived_cols.json',
+    },
+    'assets': {
+        'endpoint': '/assets',
+        'file_name': 'k8s_opencost_assets.parquet',
+        'data_types': 'assets_data_types.json',
+        'rename_cols': 'assets_rename_cols.json',
+        'ignore_keys': 'assets_ignore_keys.json',
+        'derived_cols': 'assets_derived_cols.json',
+    },
+    'cloudcost': {
+        'endpoint': '/cloudCost',
+        'file_name': 'k8s_opencost_cloudcost.parquet',
+        'data_types': 'cloudcost_data_types.json',
+        'rename_cols': 'cloudcost_rename_cols.json',
+        'ignore_keys': 'cloudcost_ignore_keys.json',
+        'derived_cols': 'cloudcost_derived_cols.json',
+    },
+}
+
+
+def is_local(config):
+    """
+    Returns True if the export is saved in the local filesystem, i.e. with the aws
+    storage backend and no S3 bucket.
+
+    Parameters:
+        config (dict): Configuration dictionary from get_config.
+
+    Returns:
+        bool: True for a local export.
+    """
+    return config.get('storage_backend', 'aws') == 'aws' and not config.get('s3_bucket')
+
+
+def get_dataset_prefix(file_key_prefix, dataset, local=False):
+    """
+    Returns the default key prefix of a dataset: a sibling of the allocation prefix,
+    named with the dataset as a suffix, e.g. 'opencost_assets/' for 'opencost/'. A local
+    prefix is often a directory the export can write in, but not its parent, e.g. the
+    default '/tmp/', so the dataset is saved in a sub-directory, e.g. '/tmp/assets/'.
+    A trailing separator of the allocation prefix is kept, since some storage backends
+    append the partition to the prefix as is.
+
+    Parameters:
+        file_key_prefix (str): Key prefix of the allocations.
+        dataset (str): Name of the dataset.
+        local (bool): If True, the prefix is a local directory.
+
+    Returns:
+        str: The key prefix of the dataset.
+    """
+    prefix = file_key_prefix.rstrip('/')
+    separator = '/' if local else '_'
+    return f"{prefix}{separator}{dataset}{file_key_prefix[len(prefix):]}"
+
+
+def parse_window(window):
+    """
+    Parses an export window. Windows exclude their end, except the default windows of a
+    day, which end at 23:59:59 and include that last second.
+
+    Parameters:
+        window (str): The window, as 'start,end' ISO datetimes.
+
+    Returns:
+        tuple: The start and the excluded end of the window, as datetimes.
+    """
+    start, end = (datetime.fromisoformat(value) for value in window.split(','))
+    if end.second == 59:
+        end += timedelta(seconds=1)
+    return start, end
+
+
+def get_window_file_name(file_name, window):
+    """
+    Returns the name of the file of an export window. The export of a whole day keeps
+    the file name of the dataset, shorter windows are named after the window, e.g.
+    'k8s_opencost_20240115T010000_20240115T020000.parquet', so the exports of a day do
+    not overwrite each other.
+
+    Parameters:
+        file_name (str): File name of the dataset.
+        window (str): The export window, as 'start,end' ISO datetimes.
+
+    Returns:
+        str: The name of the file.
+    """
+    start, end = parse_window(window)
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    if start == day and end == day + timedelta(days=1):
+        return file_name
+    root, ext = os.path.splitext(file_name)
+    return f"{root}_{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}{ext}"
+
+
+def is_window_file_name(name, file_name):
+    """
+    Returns True if a file is the export of a window shorter than a day, named by
+    get_window_file_name.
+
+    Parameters:
+        name (str): Name of the file.
+        file_name (str): File name of the dataset.
+
+    Returns:
+        bool: True if the file is an export of the dataset.
+    """
+    root, ext = os.path.splitext(file_name)
+    pattern = rf"{re.escape(root)}_\d{{8}}T\d{{6}}_\d{{8}}T\d{{6}}{re.escape(ext)}"
+    return re.fullmatch(pattern, name) is not None
+
+
+def get_dataset_config(config, dataset):
+    """
+    Builds the configuration of one dataset from the export configuration.
+
+    The allocation dataset uses the export configuration as is. The other datasets
+    query their own endpoint with the export window, and are saved under their own key
+    prefix, next to the allocation prefix, or inside it for a local export, so they
+    never share a partition with the allocations.
+
+    Parameters:
+        config (dict): Configuration dictionary from get_config.
+        dataset (str): Name of the dataset.
+
+    Returns:
+        dict: Configuration dictionary with the 'dataset', 'url', 'params', 'file_name'
+              of the window and 'file_key_prefix' of the dataset.
+
+    Raises:
+        ValueError: If the dataset is not supported.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unsupported dataset: {dataset}")
+    definition = DATASETS[dataset]
+    dataset_config = dict(config)
+    dataset_config['dataset'] = dataset
+    dataset_config['file_name'] = get_window_file_name(
+        definition['file_name'], config['window'])
+    if dataset == 'allocation':
+        return dataset_config
+
+    dataset_config['url'] = f"{config['base_url']}{definition['endpoint']}"
+    dataset_config['params'] = (("window", config['window']),)
+    dataset_config['file_key_prefix'] = os.environ.get(
+        f"OPENCOST_PARQUET_{dataset.upper()}_FILE_KEY_PREFIX",
+        get_dataset_prefix(config['file_key_prefix'], dataset, local=is_local(config)))
+    if 'schema_file' in config:
+        root, ext = os.path.splitext(config['schema_file'])
+        dataset_config['schema_file'] = f"{root}_{dataset}{ext}"
+    return dataset_config
+
+
+def extract_splits(dataset, data):
+    """
+    Extracts the splits from the 'data' of an OpenCost API response, as a list of
+    dictionaries of items by name, which is the format returned by the allocation API.
+
+    Parameters:
+        dataset (str): Name of the dataset.
+        data (list | dict): The 'data' of the API response.
+
+    Returns:
+        list: The splits of the response.
+    """
+    if dataset == 'cloudcost':
+        return [cloud_cost_set.get('cloudCosts') or {}
+                for cloud_cost_set in data.get('sets') or []]
+    if isinstance(data, dict):
+        return [data]
+    return [split or {} for split in data]
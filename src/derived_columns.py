@@ -0,0 +1,88 @@
+"""
+This module provides the derived columns of the export.
+
+Derived columns are computed from the typed columns of the processed data with
+vectorized expressions, defined next to the data types of every dataset, e.g.:
+
+    {"totalCostPerHour": {"expression": "totalCost / running_minutes * 60", "type": "float"}}
+
+Expressions use the pandas.eval syntax, which is evaluated with numexpr when it is
+installed. Column names that are not valid identifiers are quoted with backticks.
+"""
+
+import keyword
+import re
+import numpy as np
+import pandas as pd
+
+# Column names of an expression: quoted with backticks, or identifiers that are not
+# function calls.
+COLUMN_PATTERN = re.compile(r"`([^`]+)`|\b([A-Za-z_]\w*)\b(?!\s*\()")
+
+
+def expression_columns(expression):
+    """
+    Returns the columns used by an expression.
+
+    Parameters:
+        expression (str): An expression in the pandas.eval syntax.
+
+    Returns:
+        set: Names of the columns.
+    """
+    return {
+        quoted or name for quoted, name in COLUMN_PATTERN.findall(expression)
+        if quoted or not (keyword.iskeyword(name) or name in ('True', 'False'))}
+
+
+def select_derived_columns(derived_cols, columns):
+    """
+    Keeps the derived columns that can be computed from the columns of the output, e.g.
+    of a provided schema. The other ones are reported and skipped.
+
+    Parameters:
+        derived_cols (dict): Definitions of the derived columns by name.
+        columns (list): Names of the output columns.
+
+    Returns:
+        dict: Definitions of the derived columns whose columns all exist.
+    """
+    available = set(columns)
+    selected = {}
+    for name, definition in derived_cols.items():
+        missing = expression_columns(definition['expression']) - available
+        if missing:
+            print(f"Derived column {name} skipped, missing columns: {', '.join(sorted(missing))}")
+            continue
+        selected[name] = definition
+        available.add(name)
+    return selected
+
+
+def add_derived_columns(data, derived_cols):
+    """
+    Adds the derived columns to the processed data, in the order of their definitions,
+    so an expression can use the columns derived before it. Divisions by zero give
+    null values.
+
+    Parameters:
+        data (DataFrame): The processed data, with its data types applied.
+        derived_cols (dict): Definitions of the derived columns by name, each with an
+                             'expression' and a 'type'.
+
+    Returns:
+        DataFrame: The data with the derived columns.
+
+    Raises:
+        ValueError: If an expression is invalid or uses a missing column.
+    """
+    for name, definition in derived_cols.items():
+        try:
+            values = data.eval(definition['expression'])
+        except (NameError, SyntaxError, KeyError, TypeError) as err:
+            raise ValueError(f"Invalid derived column {name}: {err}") from err
+        if isinstance(values, pd.Series):
+            values = values.replace([np.inf, -np.inf], np.nan)
+        data[name] = values
+        data[name] = data[name].astype(definition['type'])
+    return data
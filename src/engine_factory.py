@@ -0,0 +1,28 @@
+"""
+This module provides a factory function for creating processing engines based on
+the specified engine name.
+"""
+
+from engines.arrow_engine import ArrowEngine
+from engines.pandas_engine import PandasEngine
+
+
+def get_engine(engine_name):
+    """
+    Factory function to create and return a processing engine based on the given name.
+
+    Parameters:
+        engine_name (str): The name of the engine. Supported: 'pandas', 'arrow'.
+
+    Returns:
+        An instance of the specified engine class.
+
+    Raises:
+        ValueError: If the specified engine is not supported.
+    """
+    if engine_name == 'pandas':
+        return PandasEngine()
+    if engine_name == 'arrow':
+        return ArrowEngine()
+
+    raise ValueError("Unsupported processing engine")
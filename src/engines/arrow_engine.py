@@ -0,0 +1,89 @@
+"""
+This module provides an implementation of the BaseEngine class based on Apache Arrow.
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from .base_engine import BaseEngine
+
+# pandas extension types, used for the types inferred by the output schema.
+EXTENSION_TYPES = {'string': pa.string(), 'boolean': pa.bool_()}
+
+
+def arrow_type(dtype):
+    """
+    Converts a data type from data_types.json into an Arrow data type.
+
+    Parameters:
+        dtype (str): A numpy/pandas data type name, e.g. 'float'.
+
+    Returns:
+        pa.DataType: The matching Arrow data type, string for non numpy types.
+    """
+    if dtype in EXTENSION_TYPES:
+        return EXTENSION_TYPES[dtype]
+    try:
+        return pa.from_numpy_dtype(np.dtype(dtype))
+    except (TypeError, pa.ArrowNotImplementedError):
+        return pa.string()
+
+
+class ArrowEngine(BaseEngine):
+    """
+    A processing engine using pyarrow. Nested allocations are converted into struct
+    columns and flattened in native code. Building the Arrow array from the allocations
+    is single-threaded, only the conversion to pandas runs on several cores, and turns
+    the string columns into object columns.
+    """
+
+    def normalize_split(self, allocations, sep):
+        allocations = list(allocations)
+        if not allocations:
+            return pa.table({})
+        # Inferring a struct array uses the keys of every allocation, while
+        # Table.from_pylist only uses the keys of the first one.
+        table = pa.Table.from_batches(
+            [pa.RecordBatch.from_struct_array(pa.array(allocations))])
+        while any(pa.types.is_struct(field.type) for field in table.schema):
+            names, columns = [], []
+            for name, column in zip(table.column_names, table.columns):
+                if pa.types.is_struct(column.type):
+                    for field, child in zip(column.type, column.flatten()):
+                        names.append(f"{name}{sep}{field.name}")
+                        columns.append(child)
+                else:
+                    names.append(name)
+                    columns.append(column)
+            table = pa.table(columns, names=names)
+        return table
+
+    def from_columns(self, columns):
+        return pa.table(columns)
+
+    def serialize_frame(self, frame):
+        # Arrow IPC stream, read back without copying the column buffers.
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, frame.schema) as writer:
+            writer.write_table(frame)
+        return sink.getvalue()
+
+    def deserialize_frame(self, data):
+        return pa.ipc.open_stream(data).read_all()
+
+    def combine(self, frames, rename_cols, data_types):
+        table = pa.concat_tables(frames, promote_options='permissive')
+        table = table.rename_columns(
+            [rename_cols.get(name, name) for name in table.column_names])
+        for name, dtype in data_types.items():
+            index = table.schema.get_field_index(name)
+            if index == -1:
+                table = table.append_column(
+                    name, pa.nulls(table.num_rows, arrow_type(dtype)))
+                continue
+            table = table.set_column(
+                index, name, pc.cast(table[index], arrow_type(dtype), safe=False))
+        # Columns of nulls lose their Arrow type in pandas unless they use the
+        # pandas extension type.
+        return table.to_pandas(use_threads=True).astype(
+            {name: dtype for name, dtype in data_types.items() if dtype in EXTENSION_TYPES})
@@ -0,0 +1,292 @@
+"""
+This module defines an abstract base class for processing engines.
+It provides a standardized interface for turning the OpenCost API response into a
+DataFrame, allowing for implementation of engines built on different libraries.
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import multiprocessing
+import threading
+
+# Splits being normalized by a process pool. Workers are forked when no other thread
+# runs, so they read the parsed response from the parent's memory instead of receiving
+# a pickled copy.
+_SHARED_SPLITS = []
+
+
+def _normalize_shared_split(engine, index, sep, plan):
+    """
+    Normalizes one of the shared splits inside a worker process.
+
+    Parameters:
+        engine (BaseEngine): The engine used to normalize the split.
+        index (int): Index of the split in the shared splits.
+        sep (str): Separator used to join nested keys into column names.
+        plan (FlattenPlan | None): Flatten plan of the output schema, if any.
+
+    Returns:
+        The serialized frame.
+    """
+    return _normalize_split(engine, _SHARED_SPLITS[index], sep, plan)
+
+
+def _normalize_split(engine, split, sep, plan):
+    """
+    Normalizes a split inside a worker process.
+
+    Parameters:
+        engine (BaseEngine): The engine used to normalize the split.
+        split (dict): The split, as received by the worker.
+        sep (str): Separator used to join nested keys into column names.
+        plan (FlattenPlan | None): Flatten plan of the output schema, if any.
+
+    Returns:
+        The serialized frame.
+    """
+    frame = engine.normalize(split.values(), sep, plan)
+    return engine.serialize_frame(frame)
+
+
+def start_worker_pool(workers):
+    """
+    Starts a pool of worker processes forked from the current process. Starting it
+    before other threads exist, e.g. before the requests and uploads of the export,
+    lets the workers be forked safely. They receive their split as an argument.
+
+    Parameters:
+        workers (int): Number of worker processes.
+
+    Returns:
+        ProcessPoolExecutor: The pool, with all its workers started.
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+    # With the fork start method, all the workers are forked at the first submission.
+    pool.submit(int).result()
+    return pool
+
+
+class BaseEngine(ABC):
+    """
+    An abstract base class that represents a processing engine.
+
+    An engine normalizes every split of the OpenCost response into an engine specific
+    frame, then combines the frames into a single pandas DataFrame with the output
+    column names and data types.
+    """
+
+    @abstractmethod
+    def normalize_split(self, allocations, sep):
+        """
+        Abstract method to flatten the allocations of one split into a frame.
+
+        Parameters:
+            allocations: Iterable of (nested) allocation dictionaries.
+            sep (str): Separator used to join nested keys into column names.
+
+        Returns:
+            An engine specific frame.
+        """
+
+    @abstractmethod
+    def from_columns(self, columns):
+        """
+        Abstract method to build a frame from flattened columns.
+
+        Parameters:
+            columns (dict): Column name to list of values.
+
+        Returns:
+            An engine specific frame.
+        """
+
+    @abstractmethod
+    def combine(self, frames, rename_cols, data_types):
+        """
+        Abstract method to concatenate the split frames, rename the columns and
+        apply the data types. Typed columns missing from the frames are added
+        with null values of their data type.
+
+        Parameters:
+            frames (list): Frames returned by normalize_split.
+            rename_cols (dict): Key-value pairs for columns to rename.
+            data_types (dict): Data types for properties of OpenCost response.
+
+        Returns:
+            DataFrame: The processed data.
+        """
+
+    def normalize(self, allocations, sep, plan=None):
+        """
+        Normalizes the allocations of one split, using the flatten plan if provided.
+
+        Parameters:
+            allocations: Iterable of (nested) allocation dictionaries.
+            sep (str): Separator used to join nested keys into column names.
+            plan (FlattenPlan | None): Flatten plan of the output schema.
+
+        Returns:
+            An engine specific frame.
+        """
+        if plan is None:
+            return self.normalize_split(allocations, sep)
+        return self.from_columns(plan.flatten(allocations))
+
+    def serialize_frame(self, frame):
+        """
+        Serializes a frame to send it from a worker process to the parent process.
+        By default the frame is pickled by the process pool.
+
+        Parameters:
+            frame: A frame returned by normalize_split.
+
+        Returns:
+            A picklable representation of the frame.
+        """
+        return frame
+
+    def deserialize_frame(self, data):
+        """
+        Restores a frame serialized by serialize_frame.
+
+        Parameters:
+            data: The value returned by serialize_frame.
+
+        Returns:
+            The frame.
+        """
+        return data
+
+    # pylint: disable=R0913
+    def normalize_parallel(self, result, sep, workers, plan=None, worker_pool=None):
+        """
+        Normalizes the splits of the result in a pool of worker processes.
+
+        The workers of worker_pool, from start_worker_pool, receive their split as an
+        argument. Without pool, workers are forked when the current thread is the only
+        one, and read the splits from the memory of the parent. Otherwise a forked child
+        could inherit a lock held by another thread and deadlock, so the workers are
+        started by a fork server and receive their split as an argument.
+
+        Parameters:
+            result (list): Splits of the OpenCost API response.
+            sep (str): Separator used to join nested keys into column names.
+            workers (int): Maximum number of worker processes.
+            plan (FlattenPlan | None): Flatten plan of the output schema.
+            worker_pool (ProcessPoolExecutor | None): Pool of worker processes to use.
+
+        Returns:
+            list: One frame per split, in the same order as the result.
+
+        Raises:
+            BrokenProcessPool: If a worker process died.
+        """
+        if worker_pool is not None:
+            return [
+                self.deserialize_frame(data)
+                for data in worker_pool.map(
+                    _normalize_split, repeat(self), result, repeat(sep), repeat(plan))]
+        max_workers = min(workers, len(result))
+        if threading.active_count() > 1:
+            with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('forkserver')) as pool:
+                return [
+                    self.deserialize_frame(data)
+                    for data in pool.map(
+                        _normalize_split, repeat(self), result, repeat(sep), repeat(plan))]
+        # pylint: disable=W0603
+        global _SHARED_SPLITS
+        _SHARED_SPLITS = result
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('fork')) as pool:
+                return [
+                    self.deserialize_frame(data)
+                    for data in pool.map(
+                        _normalize_shared_split, repeat(self), range(len(result)),
+                        repeat(sep), repeat(plan))]
+        finally:
+            _SHARED_SPLITS = []
+
+    # pylint: disable=R0913
+    def process(self, result, rename_cols, data_types, sep='.', workers=1, plan=None,
+                worker_pool=None):
+        """
+        Normalizes every split of the result and combines them.
+
+        Parameters:
+            result (list): Splits of the OpenCost API response.
+            rename_cols (dict): Key-value pairs for columns to rename.
+            data_types (dict): Data types for properties of OpenCost response.
+            sep (str): Separator used to join nested keys into column names.
+            workers (int): Number of worker processes used to normalize the splits,
+                           splits are normalized in the current process if 1.
+            plan (FlattenPlan | None): Flatten plan of the output schema. When set, the
+                                       columns and data types of the schema are used
+                                       instead of rename_cols and data_types.
+            worker_pool (ProcessPoolExecutor | None): Pool of worker processes used
+                                                      instead of a new one, see
+                                                      normalize_parallel.
+
+        Returns:
+            DataFrame: The processed data.
+        """
+        if workers > 1 and len(result) > 1:
+            frames = self.normalize_parallel(result, sep, workers, plan, worker_pool)
+        else:
+            frames = [self.normalize(split.values(), sep, plan) for split in result]
+        if plan is not None:
+            return self.combine(frames, {}, plan.data_types)
+        return self.combine(frames, rename_cols, data_types)
+
+    # pylint: disable=R0913
+    def process_batches(self, result, rename_cols, data_types, memory_budget, sep='.',
+                        plan=None):
+        """
+        Normalizes the splits of the result one at a time, and combines them in batches
+        that are closed as soon as the memory budget is under pressure. Every split is
+        released from the result once it is normalized.
+
+        Parameters:
+            result (list): Splits of the OpenCost API response.
+            rename_cols (dict): Key-value pairs for columns to rename.
+            data_types (dict): Data types for properties of OpenCost response.
+            memory_budget (MemoryBudget): The memory budget of the export.
+            sep (str): Separator used to join nested keys into column names.
+            plan (FlattenPlan | None): Flatten plan of the output schema. When set,
+                                       data_types only types its untyped columns.
+
+        Yields:
+            DataFrame: The processed data of a batch of splits.
+        """
+        if plan is not None:
+            # Types of the plan win over the types given for its untyped columns.
+            rename_cols, data_types = {}, {**data_types, **plan.data_types}
+        frames = []
+        for index, split in enumerate(result):
+            frames.append(self.normalize(split.values(), sep, plan))
+            result[index] = split = None
+            if memory_budget.under_pressure():
+                yield self._combine_batch(frames, rename_cols, data_types)
+        if frames:
+            yield self._combine_batch(frames, rename_cols, data_types)
+
+    def _combine_batch(self, frames, rename_cols, data_types):
+        """
+        Combines a batch of frames and empties the batch.
+
+        Parameters:
+            frames (list): Frames returned by normalize_split, emptied.
+            rename_cols (dict): Key-value pairs for columns to rename.
+            data_types (dict): Data types for properties of OpenCost response.
+
+        Returns:
+            DataFrame: The processed data of the batch.
+        """
+        batch = self.combine(frames, rename_cols, data_types)
+        frames.clear()
+        return batch
@@ -0,0 +1,27 @@
+"""
+This module provides an implementation of the BaseEngine class based on pandas.
+"""
+
+import pandas as pd
+from .base_engine import BaseEngine
+
+
+class PandasEngine(BaseEngine):
+    """
+    A processing engine using pandas.json_normalize. This is the default engine.
+    """
+
+    def normalize_split(self, allocations, sep):
+        return pd.json_normalize(allocations, sep=sep)
+
+    def from_columns(self, columns):
+        return pd.DataFrame(columns)
+
+    def combine(self, frames, rename_cols, data_types):
+        processed_data = pd.concat(frames)
+        processed_data.rename(columns=rename_cols, inplace=True)
+        missing = [name for name in data_types if name not in processed_data.columns]
+        if missing:
+            processed_data = processed_data.reindex(
+                columns=[*processed_data.columns, *missing])
+        return processed_data.astype(data_types)
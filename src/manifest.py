@@ -0,0 +1,157 @@
+"""
+This module provides the manifest of an export partition.
+
+The manifest lists the parquet files that currently hold the data of the partition,
+the files that were replaced by a compaction and are pending deletion, and the files
+a compaction is writing, before they are made live. It is
+rewritten in a single object write, so readers that follow the manifest always see
+either the files before or after a compaction.
+"""
+
+from datetime import timedelta
+import json
+from datasets import parse_window
+
+# Files starting with an underscore are ignored by Athena/Glue.
+MANIFEST_FILE_NAME = '_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def new_manifest():
+    """
+    Returns an empty manifest.
+
+    Returns:
+        dict: Manifest with no 'files', no 'replaced' and no 'pending' files.
+    """
+    return {'version': MANIFEST_VERSION, 'files': [], 'replaced': [], 'pending': []}
+
+
+class ManifestError(Exception):
+    """
+    Raised when the manifest of a partition exists but cannot be read. Going on without
+    it would make replaced files live again, or drop the entries of the other files.
+    """
+
+
+def read_manifest(storage, config, file_names=None):
+    """
+    Reads the manifest of the partition through the storage backend.
+
+    Parameters:
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the export.
+        file_names (list): Names of the files of the partition, listed if not provided.
+
+    Returns:
+        dict | None: The manifest, or None if the partition has no manifest.
+
+    Raises:
+        ManifestError: If the manifest exists but cannot be read or parsed.
+    """
+    if file_names is None:
+        file_names = storage.list_files(config)
+    if MANIFEST_FILE_NAME not in file_names:
+        return None
+    data = storage.read_file(MANIFEST_FILE_NAME, config)
+    if data is None:
+        raise ManifestError(f"Failed to read {MANIFEST_FILE_NAME}")
+    try:
+        manifest = json.loads(data)
+    except ValueError as err:
+        raise ManifestError(f"Invalid {MANIFEST_FILE_NAME}: {err}") from err
+    # Manifests written before compactions recorded their outputs.
+    manifest.setdefault('pending', [])
+    return manifest
+
+
+def write_manifest(manifest, storage, config):
+    """
+    Writes the manifest of the partition through the storage backend.
+
+    Parameters:
+        manifest (dict): The manifest.
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the export.
+
+    Returns:
+        str | None: The URI of the manifest, None if it could not be saved.
+    """
+    return storage.save_file(
+        json.dumps(manifest, indent=2).encode('utf-8'), MANIFEST_FILE_NAME, config)
+
+
+def live_files(manifest, file_names):
+    """
+    Returns the parquet files holding the data of the partition.
+
+    Files listed in the manifest are live. Other parquet files are live too, unless
+    they were replaced by a compaction, or are outputs of a compaction that did not
+    finish, which are recorded as pending before they are written.
+
+    Parameters:
+        manifest (dict | None): The manifest of the partition.
+        file_names (list): Names of the files of the partition.
+
+    Returns:
+        list: Names of the live parquet files.
+    """
+    if manifest is None:
+        manifest = new_manifest()
+    listed = [entry['name'] for entry in manifest['files']]
+    excluded = set(manifest['replaced']) | set(manifest['pending'])
+    unlisted = [
+        name for name in file_names
+        if name.endswith('.parquet') and name not in listed and name not in excluded]
+    return [name for name in listed if name in file_names] + unlisted
+
+
+def window_files(manifest, name, window):
+    """
+    Returns the files listed in the manifest that hold data of an export window. Files
+    exported for a window record it in their entry, and compacted files record the
+    windows of the files they merged. Files without 'windows' hold the whole day.
+
+    Parameters:
+        manifest (dict): The manifest of the partition.
+        name (str): Name of the exported file, which is overwritten rather than replaced.
+        window (str): The export window, as 'start,end' ISO datetimes.
+
+    Returns:
+        tuple: The names of the files holding data of the window only, which the export
+               replaces, and the names of the files also holding data of other windows.
+    """
+    start, end = parse_window(window)
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    covered, mixed = [], []
+    for entry in manifest['files']:
+        if entry['name'] == name:
+            continue
+        windows = [parse_window(entry_window) for entry_window in entry.get('windows', [])]
+        windows = windows or [(day, day + timedelta(days=1))]
+        if all(start <= entry_start and entry_end <= end for entry_start, entry_end in windows):
+            covered.append(entry['name'])
+        elif any(entry_start < end and start < entry_end for entry_start, entry_end in windows):
+            mixed.append(entry['name'])
+    return covered, mixed
+
+
+def delete_replaced(manifest, names, storage, config):
+    """
+    Deletes replaced files, and removes the deleted ones from the manifest.
+
+    Parameters:
+        manifest (dict): The saved manifest, listing the files as replaced.
+        names (list): Names of the replaced files.
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the export.
+
+    Returns:
+        set: Names of the deleted files.
+    """
+    deleted = {name for name in names if storage.delete_file(name, config)}
+    if deleted:
+        print(f"Deleted {len(deleted)} replaced files")
+        manifest['replaced'] = [name for name in manifest['replaced'] if name not in deleted]
+        write_manifest(manifest, storage, config)
+    return deleted
@@ -0,0 +1,166 @@
+"""
+This module provides the memory budget of the export.
+
+With a budget, the splits of the response are processed in batches that shrink when
+the resident set size (RSS) of the process gets close to the limit. Every batch is
+appended to a temporary parquet file as soon as it is processed, in row groups sized to
+the memory left, so a busy day is written with smaller batches and row groups instead
+of exceeding the memory limit of the pod.
+"""
+
+import os
+import resource
+import tempfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Suffixes of Kubernetes memory quantities, e.g. '512Mi'.
+UNITS = {'Ki': 1024, 'Mi': 1024 ** 2, 'Gi': 1024 ** 3, 'k': 1000, 'M': 1000 ** 2, 'G': 1000 ** 3}
+MIN_ROW_GROUP_SIZE = 1024
+MAX_ROW_GROUP_SIZE = 1024 * 1024
+
+
+def parse_memory_limit(value):
+    """
+    Parses a memory limit in bytes, or as a Kubernetes quantity like '512Mi'.
+
+    Parameters:
+        value (str | int | None): The memory limit.
+
+    Returns:
+        int | None: The limit in bytes, None if no limit is set.
+
+    Raises:
+        ValueError: If the value is not a valid memory quantity.
+    """
+    if value is None or value == '':
+        return None
+    value = str(value)
+    for suffix, multiplier in sorted(UNITS.items(), key=lambda unit: -len(unit[0])):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * multiplier)
+    return int(value)
+
+
+class MemoryBudget:
+    """
+    The memory limit of the export, checked against the RSS of the process.
+    """
+
+    def __init__(self, limit, pressure_ratio=0.75):
+        """
+        Parameters:
+            limit (int): Memory limit in bytes.
+            pressure_ratio (float): Share of the limit above which the memory is short.
+        """
+        self.limit = limit
+        self.pressure_ratio = pressure_ratio
+
+    def rss(self):
+        """
+        Returns the current resident set size of the process, in bytes. The peak RSS
+        is used where the current one is not available.
+        """
+        try:
+            with open('/proc/self/statm', encoding='utf-8') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def available(self):
+        """Returns the memory left under the limit, in bytes."""
+        return max(0, self.limit - self.rss())
+
+    def under_pressure(self):
+        """Returns True if the RSS is above pressure_ratio of the limit."""
+        return self.rss() >= self.limit * self.pressure_ratio
+
+    def row_group_size(self, bytes_per_row):
+        """
+        Returns the number of rows of a row group that fits in a quarter of the
+        memory left, between MIN_ROW_GROUP_SIZE and MAX_ROW_GROUP_SIZE.
+
+        Parameters:
+            bytes_per_row (int): Average in-memory size of a row.
+
+        Returns:
+            int: The number of rows.
+        """
+        rows = self.available() // 4 // max(1, bytes_per_row)
+        return int(min(MAX_ROW_GROUP_SIZE, max(MIN_ROW_GROUP_SIZE, rows)))
+
+
+def get_memory_budget(config):
+    """
+    Returns the memory budget of the configuration.
+
+    Parameters:
+        config (dict): Configuration dictionary from get_config.
+
+    Returns:
+        MemoryBudget | None: The budget, None if no memory limit is configured.
+    """
+    if config.get('memory_limit') is None:
+        return None
+    return MemoryBudget(config['memory_limit'])
+
+
+class BatchedParquetFile:
+    """
+    A parquet file written batch by batch to a temporary file, in row groups sized to
+    the memory left, so the processed data is never held in memory as a whole.
+    """
+
+    def __init__(self, memory_budget, types=None):
+        """
+        Parameters:
+            memory_budget (MemoryBudget): The memory budget of the export.
+            types (dict): Arrow types of columns the first batch may not show, e.g. lists
+                          that are null in every row of the first batch.
+        """
+        self.memory_budget = memory_budget
+        self.types = types or {}
+        self.file = tempfile.TemporaryFile()
+        self.schema = None
+        self._writer = None
+
+    def write(self, table):
+        """
+        Appends a batch to the file. The first batch sets the schema of the file, with
+        the given types, and the columns of the next ones are cast to it.
+
+        Parameters:
+            table (pa.Table): The batch.
+        """
+        if self._writer is None:
+            self.schema = pa.schema(
+                [field.with_type(self.types.get(field.name, field.type))
+                 for field in table.schema], metadata=table.schema.metadata)
+            self._writer = pq.ParquetWriter(self.file, self.schema)
+        table = table.select(self.schema.names).cast(self.schema)
+        bytes_per_row = max(1, table.nbytes // max(1, table.num_rows))
+        offset = 0
+        while offset < table.num_rows:
+            rows = self.memory_budget.row_group_size(bytes_per_row)
+            self._writer.write_table(table.slice(offset, rows), rows)
+            offset += rows
+
+    def close(self):
+        """Finishes the parquet file and rewinds it, ready to be uploaded."""
+        if self._writer is None:
+            self.schema = pa.schema([])
+            self._writer = pq.ParquetWriter(self.file, self.schema)
+        self._writer.close()
+        self.file.seek(0)
+
+    def iter_row_groups(self):
+        """
+        Reads the finished file back one row group at a time.
+
+        Yields:
+            pa.Table: The data of a row group.
+        """
+        self.file.seek(0)
+        parquet_file = pq.ParquetFile(self.file)
+        for index in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(index)
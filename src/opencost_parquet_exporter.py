@@ -5,12 +5,28 @@ This module provides an implementation of the OpenCost storage exporter.
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 import os
 import json
+import zlib
 import pandas as pd
+import pyarrow as pa
 import requests
+from derived_columns import add_derived_columns, select_derived_columns
+from datasets import DATASETS, extract_splits, get_dataset_config
+from engine_factory import get_engine
+from engines.base_engine import start_worker_pool
+from manifest import delete_replaced
+from memory import BatchedParquetFile, get_memory_budget, parse_memory_limit
 from storage_factory import get_storage
+from profiler import Profiler
+from query_index import index_file, replaced_files
+from schema import (FlattenPlan, discover_schema, evolve_schema, load_schema, read_schema,
+                    sample_values, write_schema)
+from transfer import RawPayload, get_accept_encoding, read_json_response
 
 
 def load_config_file(file_path: str):
@@ -44,6 +60,19 @@ def get_config(
         storage_backend=None,
         include_idle=None,
         idle_by_node=None,
+        profile=None,
+        engine=None,
+        workers=None,
+        schema_file=None,
+        schema_drift=None,
+        datasets=None,
+        compression=None,
+        record_raw=None,
+        memory_limit=None,
+        index=None,
+        index_distinct=None,
+        index_bloom=None,
+        read_timeout=None,
 ):
     """
     Get configuration for the parquet exporter based on either provided
@@ -88,10 +117,59 @@ def get_config(
     - idle_by_node (str): If true, idle allocations are created on a per node basis,
                           defaults to the 'OPENCOST_PARQUET_IDLE_BY_NODE' environment 
                           variable, or 'false' if not set.
+    - profile (str): If true, the export stages are profiled with cProfile and tracemalloc,
+                     defaults to the 'OPENCOST_PARQUET_PROFILE' environment
+                     variable, or 'false' if not set.
+    - engine (str): Processing engine used to normalize the data ('pandas' or 'arrow'),
+                    defaults to the 'OPENCOST_PARQUET_ENGINE' environment
+                    variable, or 'pandas' if not set.
+    - workers (int): Number of processes used to normalize the splits of the response,
+                     defaults to the 'OPENCOST_PARQUET_WORKERS' environment
+                     variable, or 1 if not set.
+    - schema_file (str): Path of the versioned output schema. An existing file is used as
+                         provided. Otherwise the schema is computed from the data and
+                         saved on the first run through the storage backend, under the
+                         name of the file at the root of the export prefix, then reused
+                         for every export, defaults to the 'OPENCOST_PARQUET_SCHEMA_FILE'
+                         environment variable, or no output schema if not set.
+    - schema_drift (str): What to do with fields missing from the output schema, 'drop',
+                          'report' (drop and print them) or 'evolve' (add them to the
+                          stored schema as a new version), defaults to the
+                          'OPENCOST_PARQUET_SCHEMA_DRIFT' environment variable,
+                          or 'report' if not set.
+    - datasets (str): Datasets to export, separated by commas ('allocation', 'assets',
+                      'cloudcost'), defaults to the 'OPENCOST_PARQUET_DATASETS'
+                      environment variable, or 'allocation' if not set.
+    - compression (str): Compression requested for the API responses, 'auto' (zstd when the
+                         zstandard package is installed, and gzip), 'zstd', 'gzip' or 'none',
+                         defaults to the 'OPENCOST_PARQUET_COMPRESSION' environment
+                         variable, or 'auto' if not set.
+    - record_raw (str): If true, the raw (compressed) API responses are saved next to the
+                        export, defaults to the 'OPENCOST_PARQUET_RECORD_RAW' environment
+                        variable, or 'false' if not set.
+    - memory_limit (str): Memory budget of the export, in bytes or as a Kubernetes quantity
+                          like '512Mi', defaults to the 'OPENCOST_PARQUET_MEMORY_LIMIT'
+                          environment variable, or no budget if not set.
+    - index (str): If true, the exported files are indexed in the partition manifest,
+                   defaults to the 'OPENCOST_PARQUET_INDEX' environment variable, or 'false'
+                   if not set.
+    - index_distinct (str): Columns whose distinct values are indexed, separated by commas,
+                            defaults to the 'OPENCOST_PARQUET_INDEX_DISTINCT' environment
+                            variable, or 'properties.namespace,label.team'.
+    - index_bloom (str): Columns indexed with a bloom filter, separated by commas, defaults
+                         to the 'OPENCOST_PARQUET_INDEX_BLOOM' environment variable, or
+                         'properties.pod' if not set.
+    - read_timeout (float): Seconds to wait for data from the OpenCost API, defaults to the
+                            'OPENCOST_PARQUET_READ_TIMEOUT' environment variable, or 900
+                            if not set.
 
     Returns:
     - dict: Configuration dictionary with keys for 'url', 'params', 's3_bucket',
             'file_key_prefix' and 'window_start'.
+
+    Raises:
+    - ValueError: If no dataset or an unsupported dataset, compression or memory limit
+                  is configured.
     """
     config = {}
 
@@ -128,12 +206,59 @@ def get_config(
     if storage_backend is None:
         storage_backend = os.environ.get(
             'OPENCOST_PARQUET_STORAGE_BACKEND', 'aws')  # For backward compatibility
+    if profile is None:
+        profile = os.environ.get('OPENCOST_PARQUET_PROFILE', 'false')
+    if engine is None:
+        engine = os.environ.get('OPENCOST_PARQUET_ENGINE', 'pandas')
+    if workers is None:
+        workers = int(os.environ.get('OPENCOST_PARQUET_WORKERS', 1))
+    if schema_file is None:
+        schema_file = os.environ.get('OPENCOST_PARQUET_SCHEMA_FILE', None)
+    if schema_drift is None:
+        schema_drift = os.environ.get('OPENCOST_PARQUET_SCHEMA_DRIFT', 'report')
+    if datasets is None:
+        datasets = os.environ.get('OPENCOST_PARQUET_DATASETS', 'allocation')
+    if compression is None:
+        compression = os.environ.get('OPENCOST_PARQUET_COMPRESSION', 'auto')
+    if record_raw is None:
+        record_raw = os.environ.get('OPENCOST_PARQUET_RECORD_RAW', 'false')
+    if memory_limit is None:
+        memory_limit = os.environ.get('OPENCOST_PARQUET_MEMORY_LIMIT', None)
+    if index is None:
+        index = os.environ.get('OPENCOST_PARQUET_INDEX', 'false')
+    if index_distinct is None:
+        index_distinct = os.environ.get(
+            'OPENCOST_PARQUET_INDEX_DISTINCT', 'properties.namespace,label.team')
+    if index_bloom is None:
+        index_bloom = os.environ.get('OPENCOST_PARQUET_INDEX_BLOOM', 'properties.pod')
+    if read_timeout is None:
+        read_timeout = os.environ.get('OPENCOST_PARQUET_READ_TIMEOUT', 900)
 
     if s3_bucket is not None:
         config['s3_bucket'] = s3_bucket
     config['storage_backend'] = storage_backend
-    config['url'] = f"http://{hostname}:{port}/allocation/compute"
+    config['base_url'] = f"http://{hostname}:{port}"
+    config['url'] = f"{config['base_url']}{DATASETS['allocation']['endpoint']}"
     config['file_key_prefix'] = file_key_prefix
+    config['profile'] = str(profile).lower() == 'true'
+    config['engine'] = engine
+    config['workers'] = workers
+    if schema_file is not None:
+        config['schema_file'] = schema_file
+    config['schema_drift'] = schema_drift
+    config['datasets'] = [dataset.strip() for dataset in datasets.split(',') if dataset.strip()]
+    if not config['datasets']:
+        raise ValueError("No dataset to export, set OPENCOST_PARQUET_DATASETS")
+    for dataset in config['datasets']:
+        if dataset not in DATASETS:
+            raise ValueError(f"Unsupported dataset: {dataset}")
+    config['accept_encoding'] = get_accept_encoding(compression)
+    config['record_raw'] = str(record_raw).lower() == 'true'
+    config['memory_limit'] = parse_memory_limit(memory_limit)
+    config['index'] = str(index).lower() == 'true'
+    config['index_distinct'] = [column for column in index_distinct.split(',') if column]
+    config['index_bloom'] = [column for column in index_bloom.split(',') if column]
+    config['read_timeout'] = float(read_timeout)
 
     # Azure-specific configuration
     if config['storage_backend'] == 'azure':
@@ -160,6 +285,7 @@ def get_config(
         window_end = yesterday+'T23:59:59Z'
     window = f"{window_start},{window_end}"
     config['window_start'] = window_start
+    config['window'] = window
     config['params'] = [
         ("window", window),
         ("includeIdle", include_idle),
@@ -182,49 +308,60 @@ def get_config(
     return config
 
 
-def request_data(config):
+def request_data(config, session=None, raw_payload=None):
     """
     Request data from the OpenCost service using the provided configuration.
 
+    When the configuration has an 'accept_encoding', a compressed response is requested
+    and streamed, and decompressed incrementally while it is received.
+
     Parameters:
     - config (dict): Configuration dictionary with necessary URL and parameters for the API request.
+    - session (requests.Session): HTTP session used for the request, to share connections
+                                  between requests. A new connection is used if not set.
+    - raw_payload (RawPayload): If set, receives the raw (compressed) response body.
 
     Returns:
     - dict or None: The response from the OpenCost API parsed as a dictionary, or None if an error
                     occurs.
     """
     url, params = config['url'], config['params']
+    http = session if session is not None else requests
+    stream = 'accept_encoding' in config
     try:
-        response = requests.get(
+        response = http.get(
             url,
             params=params,
-            # 15 seconds connect timeout
-            # No read timeout, in case it takes a long
-            timeout=(15, None)
+            headers={'Accept-Encoding': config['accept_encoding']} if stream else None,
+            stream=stream,
+            # 15 seconds connect timeout. The read timeout is the longest wait for
+            # data, OpenCost may take minutes to compute a response.
+            timeout=(15, config.get('read_timeout'))
         )
-        response.raise_for_status()
-        if 'application/json' in response.headers['content-type']:
-            response_object = response.json()['data']
-            return response_object
-        print(f"Invalid content type: {response.headers['content-type']}")
-        return None
+        with response:
+            response.raise_for_status()
+            if 'application/json' in response.headers['content-type']:
+                if stream:
+                    response_object = read_json_response(response, raw_payload)['data']
+                else:
+                    response_object = response.json()['data']
+                return response_object
+            print(f"Invalid content type: {response.headers['content-type']}")
+            return None
     except (requests.exceptions.RequestException, requests.exceptions.Timeout,
-            requests.exceptions.TooManyRedirects, ValueError, KeyError) as err:
+            requests.exceptions.TooManyRedirects, ValueError, KeyError, zlib.error) as err:
         print(f"Request error: {err}")
         return None
 
 
-def process_result(result, ignored_alloc_keys, rename_cols, data_types):
+def remove_ignored_data(result, ignored_alloc_keys):
     """
-    Process raw results from the OpenCost API data request.
+    Remove the unmounted PV allocations and the ignored allocation keys from the
+    raw results, in place.
+
     Parameters:
-    - result (dict): Raw response data from the OpenCost API.
+    - result (list): Raw response data from the OpenCost API.
     - ignored_alloc_keys (dict): Allocation keys to ignore
-    - rename_cols (dict): Key-value pairs for coloumns to rename
-    - data_types (dict): Data types for properties of OpenCost response 
-
-    Returns:
-    - DataFrame or None: Processed data as a Pandas DataFrame, or None if an error occurs.
     """
     for split in result:
         # Remove entry for unmounted pv's .
@@ -234,15 +371,54 @@ def process_result(result, ignored_alloc_keys, rename_cols, data_types):
         for alloc_name in split.keys():
             for ignored_key in ignored_alloc_keys:
                 split[alloc_name].pop(ignored_key, None)
+
+
+# pylint: disable=R0911
+def process_result(result, ignored_alloc_keys, rename_cols, data_types, engine='pandas',
+                   workers=1, flatten_plan=None, memory_budget=None, derived_cols=None,
+                   worker_pool=None):
+    """
+    Process raw results from the OpenCost API data request.
+    Parameters:
+    - result (dict): Raw response data from the OpenCost API.
+    - ignored_alloc_keys (dict): Allocation keys to ignore
+    - rename_cols (dict): Key-value pairs for coloumns to rename
+    - data_types (dict): Data types for properties of OpenCost response 
+    - engine (str): Name of the processing engine, 'pandas' (default) or 'arrow'.
+    - workers (int): Number of processes used to normalize the splits in parallel.
+    - flatten_plan (FlattenPlan): Flatten plan of the output schema. When set, the columns
+                                  and data types of the schema replace rename_cols and
+                                  data_types, and missing fields are filled with nulls.
+    - memory_budget (MemoryBudget): If set, the splits are processed in batches that follow
+                                    the budget, in the current process, and are released
+                                    from the result once converted.
+    - derived_cols (dict): Derived columns computed from the processed data, by name, each
+                           with an 'expression' and a 'type'.
+    - worker_pool (ProcessPoolExecutor): Pool of worker processes from start_worker_pool,
+                                         used instead of starting one.
+
+    Returns:
+    - DataFrame, BatchedParquetFile or None: Processed data as a Pandas DataFrame, or
+                                             written to a temporary parquet file with a
+                                             memory budget, or None if an error occurs.
+    """
+    remove_ignored_data(result, ignored_alloc_keys)
+    if flatten_plan is not None and flatten_plan.drift != 'drop':
+        for path in flatten_plan.new_fields(result):
+            print(f"Field not in output schema v{flatten_plan.version}, dropped: {path}")
     try:
-        frames = [
-            pd.json_normalize(
-                split.values(),
-                sep=os.environ.get('OPENCOST_PARQUET_JSON_SEPARATOR', '.'))
-            for split in result]
-        processed_data = pd.concat(frames)
-        processed_data.rename(columns=rename_cols, inplace=True)
-        processed_data = processed_data.astype(data_types)
+        if memory_budget is not None:
+            return process_batches(result, rename_cols, data_types, engine, flatten_plan,
+                                   memory_budget, derived_cols or {})
+        processed_data = get_engine(engine).process(
+            result,
+            rename_cols=rename_cols,
+            data_types=data_types,
+            sep=os.environ.get('OPENCOST_PARQUET_JSON_SEPARATOR', '.'),
+            workers=workers,
+            plan=flatten_plan,
+            worker_pool=worker_pool)
+        processed_data = add_derived_columns(processed_data, derived_cols or {})
     except pd.errors.EmptyDataError as err:
         print(f"No data: {err}")
         return None
@@ -258,69 +434,373 @@ def process_result(result, ignored_alloc_keys, rename_cols, data_types):
     except KeyError as err:
         print(f"Key error: {err}")
         return None
+    except pa.ArrowException as err:
+        print(f"Arrow error: {err}")
+        return None
+    except BrokenProcessPool as err:
+        print(f"Worker process failed: {err}")
+        return None
     return processed_data
 
 
-def save_result(processed_result, config):
+# pylint: disable=R0913
+def process_batches(result, rename_cols, data_types, engine, flatten_plan, memory_budget,
+                    derived_cols):
+    """
+    Processes the splits of the result in batches that follow the memory budget. Every
+    batch is appended to a temporary parquet file before the next one is processed.
+
+    Parameters:
+    - result (list): Splits of the OpenCost API response, released once converted.
+    - rename_cols (dict): Key-value pairs for coloumns to rename
+    - data_types (dict): Data types for properties of OpenCost response
+    - engine (str): Name of the processing engine.
+    - flatten_plan (FlattenPlan): Flatten plan of the output schema, if any.
+    - memory_budget (MemoryBudget): The memory budget of the export.
+    - derived_cols (dict): Derived columns computed from every batch.
+
+    Returns:
+    - BatchedParquetFile: Processed data, written to a temporary parquet file.
+    """
+    sep = os.environ.get('OPENCOST_PARQUET_JSON_SEPARATOR', '.')
+    # Every batch is written with the same parquet schema, so the columns and their
+    # types are computed up front from all the splits.
+    schema = discover_schema(result, rename_cols, data_types, sep=sep)
+    if flatten_plan is None:
+        flatten_plan = FlattenPlan(schema, drift='drop')
+    columns = set(flatten_plan.columns)
+    inferred_types = {column['name']: column['type'] for column in schema['columns']
+                      if column['type'] is not None and column['name'] in columns}
+    # Lists have no data type, the parquet type of their column is taken from the
+    # first list of the column, wherever it is.
+    untyped = [column for column in schema['columns']
+               if column['type'] is None and column['name'] in columns]
+    samples = sample_values(result, [tuple(column['path']) for column in untyped])
+    list_types = {column['name']: pa.array([samples[tuple(column['path'])]]).type
+                  for column in untyped if tuple(column['path']) in samples}
+    batches = get_engine(engine).process_batches(
+        result,
+        rename_cols={},
+        data_types=inferred_types,
+        memory_budget=memory_budget,
+        sep=sep,
+        plan=flatten_plan)
+    parquet_file = BatchedParquetFile(memory_budget, list_types)
+    for batch in batches:
+        parquet_file.write(pa.Table.from_pandas(
+            add_derived_columns(batch, derived_cols), preserve_index=False))
+    parquet_file.close()
+    return parquet_file
+
+
+def write_result(processed_result, config, storage):
+    """
+    Writes the processed result through the storage backend.
+
+    Parameters:
+    - processed_result (DataFrame | BatchedParquetFile): The processed data to save.
+    - config (dict): Configuration dictionary of the dataset.
+    - storage (BaseStorage): Storage backend to use.
+
+    Returns:
+    - str or None: The URI of the saved data, or None if it could not be saved.
+    """
+    if isinstance(processed_result, BatchedParquetFile):
+        processed_result.file.seek(0)
+        return storage.save_file(
+            processed_result.file, config.get('file_name', 'k8s_opencost.parquet'), config)
+    return storage.save_data(data=processed_result, config=config)
+
+
+def save_result(processed_result, config, storage=None):
     """
     Save the processed result either to the local filesystem or an S3 bucket
     in parquet file format.
 
     Parameters:
-    - processed_result (DataFrame): The processed data to save.
+    - processed_result (DataFrame | BatchedParquetFile): The processed data to save.
     - config (dict): Configuration dictionary including keys for the S3 bucket,
                      file key prefix, and others.
+    - storage (BaseStorage): Storage backend to use, created from the configuration
+                             if not set.
 
     Returns:
     - uri : String with the path where the data was saved.
     """
     # TODO: Handle save to local file system. Make it default maybe?
-    storage = get_storage(storage_backend=config['storage_backend'])
-    uri = storage.save_data(data=processed_result, config=config)
+    if storage is None:
+        storage = get_storage(storage_backend=config['storage_backend'])
+    uri = write_result(processed_result, config, storage)
     if uri:
         print(f"Data successfully saved at: {uri}")
     else:
         print("Failed to save data.")
         sys.exit(1)
 
+
+def get_flatten_plan(config, result, ignored_alloc_keys, rename_cols, data_types, storage):
+    """
+    Loads the output schema and compiles its flatten plan. A schema file that exists at
+    config['schema_file'] is used as provided. Otherwise the schema is read through the
+    storage backend, or computed from the result and saved there on the first run.
+    With the 'evolve' drift mode, fields that are not in a stored schema are added to it
+    as a new version.
+
+    Parameters:
+    - config (dict): Configuration dictionary including 'schema_file' and 'schema_drift'.
+    - result (list): Raw response data from the OpenCost API.
+    - ignored_alloc_keys (dict): Allocation keys to ignore
+    - rename_cols (dict): Key-value pairs for coloumns to rename
+    - data_types (dict): Data types for properties of OpenCost response
+    - storage (BaseStorage): Storage backend the schema is saved with.
+
+    Returns:
+    - FlattenPlan or None: The compiled flatten plan, or None if an error occurs.
+    """
+    sep = os.environ.get('OPENCOST_PARQUET_JSON_SEPARATOR', '.')
+    if os.path.exists(config['schema_file']):
+        schema = load_schema(config['schema_file'])
+        print(f"Using output schema v{schema['version']} from: {config['schema_file']}")
+        return FlattenPlan(schema, drift=config['schema_drift'])
+    file_names = storage.list_files(config, partition=False)
+    schema = read_schema(storage, config, file_names)
+    if schema is None and os.path.basename(config['schema_file']) in file_names:
+        print("Failed to read the output schema.")
+        return None
+    remove_ignored_data(result, ignored_alloc_keys)
+    if schema is None:
+        new_schema = discover_schema(result, rename_cols, data_types, sep=sep)
+    elif config['schema_drift'] == 'evolve':
+        new_schema = evolve_schema(schema, result, rename_cols, data_types, sep=sep)
+    else:
+        new_schema = schema
+    if new_schema is not schema:
+        uri = write_schema(new_schema, storage, config)
+        if uri is None:
+            print("Failed to save the output schema.")
+            return None
+        print(f"Output schema v{new_schema['version']} saved at: {uri}")
+        schema = new_schema
+    print(f"Using output schema v{schema['version']}")
+    return FlattenPlan(schema, drift=config['schema_drift'])
+
+
+def load_dataset_files(dataset):
+    """
+    Loads the flatten rules of a dataset.
+
+    Parameters:
+    - dataset (str): Name of the dataset.
+
+    Returns:
+    - tuple: The data types, the columns to rename, the keys to ignore and the derived
+             columns.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    definition = DATASETS[dataset]
+    return (
+        load_config_file(file_path=f"{directory}/{definition['data_types']}"),
+        load_config_file(file_path=f"{directory}/{definition['rename_cols']}"),
+        load_config_file(file_path=f"{directory}/{definition['ignore_keys']}"),
+        load_config_file(file_path=f"{directory}/{definition['derived_cols']}"),
+    )
+
+
+def fetch_dataset(config, session, storage, profiler):
+    """
+    Requests the data of a dataset and extracts its splits. The raw response is saved
+    through the storage backend if config['record_raw'] is set.
+
+    Parameters:
+    - config (dict): Configuration dictionary of the dataset.
+    - session (requests.Session): HTTP session shared by all datasets.
+    - storage (BaseStorage): Storage backend shared by all datasets.
+    - profiler (Profiler): Profiler of the run.
+
+    Returns:
+    - list or None: The splits of the response, or None if an error occurs.
+    """
+    raw_payload = RawPayload() if config['record_raw'] else None
+    with profiler.stage(f"{config['dataset']}_request_data"):
+        result = request_data(config=config, session=session, raw_payload=raw_payload)
+    if result is None:
+        return None
+    if raw_payload is not None:
+        uri = storage.save_file(
+            raw_payload.getvalue(), raw_payload.file_name(f"_raw_{config['dataset']}"), config)
+        if uri is None:
+            print(f"Failed to save the raw {config['dataset']} response.")
+            return None
+        print(f"Raw response saved at: {uri}")
+    return extract_splits(config['dataset'], result)
+
+
+def process_dataset(config, result, storage, profiler, worker_pool=None):
+    """
+    Processes the splits of a dataset with its flatten rules.
+
+    Parameters:
+    - config (dict): Configuration dictionary of the dataset.
+    - result (list): The splits of the response.
+    - storage (BaseStorage): Storage backend holding the output schema.
+    - profiler (Profiler): Profiler of the run.
+    - worker_pool (ProcessPoolExecutor): Pool of worker processes from start_worker_pool.
+
+    Returns:
+    - DataFrame, BatchedParquetFile or None: Processed data, or None if an error occurs.
+    """
+    data_types, rename_cols, ignore_keys, derived_cols = load_dataset_files(config['dataset'])
+    flatten_plan = None
+    if 'schema_file' in config:
+        flatten_plan = get_flatten_plan(
+            config, result, ignore_keys, rename_cols, data_types, storage)
+        if flatten_plan is None:
+            return None
+        # A provided schema may not have every column used by the derived columns.
+        derived_cols = select_derived_columns(derived_cols, flatten_plan.columns)
+    with profiler.stage(f"{config['dataset']}_process_result"):
+        return process_result(
+            result=result,
+            ignored_alloc_keys=ignore_keys,
+            rename_cols=rename_cols,
+            data_types=data_types,
+            engine=config['engine'],
+            workers=config['workers'],
+            flatten_plan=flatten_plan,
+            memory_budget=get_memory_budget(config),
+            derived_cols=derived_cols,
+            worker_pool=worker_pool)
+
+
+def save_dataset(processed_data, config, storage, profiler):
+    """
+    Saves the processed data of a dataset, and indexes it in the partition manifest
+    if config['index'] is set. Files of the manifest that only hold data of the export
+    window, e.g. compacted from an earlier export of the window, are then replaced.
+
+    Parameters:
+    - processed_data (DataFrame | BatchedParquetFile): The processed data.
+    - config (dict): Configuration dictionary of the dataset.
+    - storage (BaseStorage): Storage backend shared by all datasets.
+    - profiler (Profiler): Profiler of the run.
+    """
+    replaced = []
+    if config['index']:
+        replaced = replaced_files(storage, config)
+        if replaced is None:
+            print(f"Failed to replace the {config['dataset']} files of the window.")
+            sys.exit(1)
+    with profiler.stage(f"{config['dataset']}_save_result"):
+        save_result(processed_data, config, storage)
+    if config['index']:
+        with profiler.stage(f"{config['dataset']}_index_file"):
+            manifest = index_file(storage, config, processed_data, replaced)
+            if manifest is None:
+                print(f"Failed to save the {config['dataset']} query index.")
+                sys.exit(1)
+        delete_replaced(manifest, replaced, storage, config)
+
+
+class ExportError(Exception):
+    """
+    Raised when a dataset of the export failed.
+    """
+
+
+def abort_export(pool, saves, message):
+    """
+    Stops the export after a dataset failed. Requests and uploads that did not start are
+    cancelled and running uploads are finished, so no partial file is left. Running
+    requests end within the read timeout.
+
+    Parameters:
+    - pool (ThreadPoolExecutor): The pool running the requests and uploads.
+    - saves (list): Futures of the uploads.
+    - message (str): Why the export stopped.
+
+    Raises:
+    - ExportError: Always.
+    """
+    pool.shutdown(wait=False, cancel_futures=True)
+    wait(saves)
+    raise ExportError(message)
+
+
+def export_datasets(config, storage, profiler):
+    """
+    Exports all configured datasets in one pass. Requests and uploads run concurrently
+    and share the HTTP session and the storage backend, while every response is
+    processed in the main thread as soon as it arrives. The export stops as soon as a
+    dataset fails. Worker processes are forked before the requests and uploads start
+    their threads.
+
+    Parameters:
+    - config (dict): Configuration dictionary from get_config.
+    - storage (BaseStorage): The storage backend.
+    - profiler (Profiler): Profiler of the run.
+
+    Raises:
+    - ExportError: If a dataset failed.
+    """
+    dataset_configs = [get_dataset_config(config, dataset) for dataset in config['datasets']]
+    parallel = config['workers'] > 1 and config.get('memory_limit') is None
+    with start_worker_pool(config['workers']) if parallel else nullcontext() as worker_pool, \
+            requests.Session() as session, \
+            ThreadPoolExecutor(max_workers=2 * len(dataset_configs)) as pool:
+        fetches = {
+            pool.submit(fetch_dataset, dataset_config, session, storage, profiler):
+            dataset_config
+            for dataset_config in dataset_configs}
+        saves = []
+        for fetch in as_completed(fetches):
+            dataset_config = fetches.pop(fetch)
+            dataset = dataset_config['dataset']
+            result = fetch.result()
+            if result is None:
+                abort_export(pool, saves, f"Result of {dataset} is None. Aborting execution")
+            print(f"Opencost {dataset} data retrieved successfully")
+
+            print(f"Processing the {dataset} data")
+            processed_data = process_dataset(
+                dataset_config, result, storage, profiler, worker_pool)
+            if processed_data is None:
+                abort_export(
+                    pool, saves, f"Processed {dataset} data is None, aborting execution.")
+            print(f"Data of {dataset} processed successfully")
+
+            print(f"Saving {dataset} data")
+            saves.append(pool.submit(
+                save_dataset, processed_data, dataset_config, storage, profiler))
+        for save in saves:
+            try:
+                save.result()
+            except SystemExit:
+                abort_export(pool, saves, "Failed to save a dataset, aborting execution.")
+
 # pylint: disable=C0116
 
 
 def main():
     # TODO: Error handling when load fails
     print("Starting run")
-    print("Load data types")
-    data_types = load_config_file(
-        file_path=f'{os.path.dirname(os.path.abspath(__file__))}/data_types.json')
-    print("Load renaming coloumns")
-    rename_cols = load_config_file(
-        file_path=f'{os.path.dirname(os.path.abspath(__file__))}/rename_cols.json')
-    print("Load allocation keys to ignore")
-    ignore_alloc_keys = load_config_file(
-        file_path=f'{os.path.dirname(os.path.abspath(__file__))}/ignore_alloc_keys.json')
-
     print("Build config")
     config = get_config()
-    print("Retrieving data from opencost api")
-    result = request_data(config=config)
-    if result is None:
-        print("Result is None. Aborting execution")
-        sys.exit(1)
-    print("Opencost data retrieved successfully")
-
-    print("Processing the data")
-    processed_data = process_result(
-        result=result,
-        ignored_alloc_keys=ignore_alloc_keys,
-        rename_cols=rename_cols,
-        data_types=data_types)
-    if processed_data is None:
-        print("Processed data is None, aborting execution.")
+    storage = get_storage(storage_backend=config['storage_backend'])
+    profiler = Profiler(enabled=config['profile'])
+    print(f"Exporting datasets: {', '.join(config['datasets'])}")
+    failed = False
+    try:
+        export_datasets(config, storage, profiler)
+    except ExportError as err:
+        print(err)
+        failed = True
+
+    if profiler.enabled:
+        print("Saving profiling artifacts")
+        for uri in profiler.save(storage, config):
+            print(f"Profile saved at: {uri}")
+    if failed:
         sys.exit(1)
-    print("Data processed successfully")
-
-    print("Saving data")
-    save_result(processed_data, config)
 
 
 if __name__ == "__main__":
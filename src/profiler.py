@@ -0,0 +1,129 @@
+"""
+This module provides optional profiling hooks for the OpenCost parquet exporter.
+
+When enabled, every stage of the export is run under cProfile and tracemalloc, and
+the collected statistics can be written through the configured storage backend.
+tracemalloc traces the whole process, so profiled stages run one at a time, even when
+the export runs them on several threads: the memory figures of a stage are then its own.
+"""
+
+import cProfile
+from contextlib import contextmanager
+import io
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+
+# Files starting with an underscore are ignored by Athena/Glue, so the profiling
+# artifacts can live next to the parquet export without breaking the table.
+PROFILE_FILE_PREFIX = '_profile'
+
+
+class Profiler:
+    """
+    Collects a CPU profile, wall time and memory allocation statistics for each
+    named stage of an export run. All hooks are no-ops when profiling is disabled.
+    """
+
+    def __init__(self, enabled=False, top_n=25):
+        """
+        Parameters:
+            enabled (bool): Whether profiling is enabled.
+            top_n (int): Number of functions and allocation sites kept in the summary.
+        """
+        self.enabled = enabled
+        self.top_n = top_n
+        self.stages = []
+        self._lock = threading.Lock()
+        self._owner = None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager that profiles the enclosed block as the stage `name`. Stages of
+        other threads wait until it ends. Stages cannot be nested, since only one
+        cProfile profiler can be enabled at a time.
+
+        Parameters:
+            name (str): Name of the stage, used in the artifact file names.
+
+        Raises:
+            RuntimeError: If the stage is entered inside another stage.
+        """
+        if not self.enabled:
+            yield
+            return
+        if self._owner == threading.get_ident():
+            raise RuntimeError(f"Stage {name} is nested in another profiled stage")
+        with self._lock:
+            self._owner = threading.get_ident()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                self._owner = None
+                elapsed = time.perf_counter() - start
+                current, peak = tracemalloc.get_traced_memory()
+                allocations = tracemalloc.take_snapshot().statistics('lineno')
+                profile.create_stats()
+                self.stages.append({
+                    'name': name,
+                    'seconds': elapsed,
+                    'current_bytes': current,
+                    'peak_bytes': peak,
+                    'allocations': allocations[:self.top_n],
+                    'profile': profile,
+                })
+
+    def summary(self) -> str:
+        """
+        Builds a human readable summary of all profiled stages.
+
+        Returns:
+            str: Wall time, traced memory, top allocations and top functions per stage.
+        """
+        out = io.StringIO()
+        for stage in self.stages:
+            out.write(f"== Stage {stage['name']}: {stage['seconds']:.3f}s, "
+                      f"traced memory {stage['current_bytes'] / 2**20:.1f} MiB, "
+                      f"peak {stage['peak_bytes'] / 2**20:.1f} MiB\n")
+            out.write(f"-- Top {self.top_n} allocations\n")
+            for allocation in stage['allocations']:
+                out.write(f"{allocation}\n")
+            out.write(f"-- Top {self.top_n} functions by cumulative time\n")
+            stats = pstats.Stats(stage['profile'], stream=out)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+        return out.getvalue()
+
+    def save(self, storage, config) -> list:
+        """
+        Writes the pstats file of every stage and the text summary through the
+        storage backend, next to the exported data.
+
+        Parameters:
+            storage (BaseStorage): The storage backend used for the export.
+            config (dict): Configuration dictionary used for the export.
+
+        Returns:
+            list: The URIs of the saved artifacts.
+        """
+        if not self.enabled:
+            return []
+        uris = []
+        for stage in self.stages:
+            # Same format as pstats.Stats.dump_stats, loadable with pstats.Stats(path).
+            uris.append(storage.save_file(
+                marshal.dumps(stage['profile'].stats),
+                f"{PROFILE_FILE_PREFIX}_{stage['name']}.pstats", config))
+        uris.append(storage.save_file(
+            self.summary().encode('utf-8'),
+            f"{PROFILE_FILE_PREFIX}_summary.txt", config))
+        return [uri for uri in uris if uri]
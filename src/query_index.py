@@ -0,0 +1,334 @@
+"""
+This module provides the query index of the export partitions.
+
+Every parquet file listed in the partition manifest gets its row count, the min/max
+of its columns, the distinct values of low cardinality columns (e.g. namespaces and
+teams) and bloom filters of high cardinality columns (e.g. pods). Tools reading the
+export can then select the relevant files from the manifests alone, without opening
+every parquet footer.
+"""
+
+import base64
+from datetime import date, timedelta
+import hashlib
+import math
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from memory import BatchedParquetFile
+from manifest import (ManifestError, live_files, new_manifest, read_manifest, window_files,
+                      write_manifest)
+
+# Distinct values are not indexed above this many values per file.
+MAX_DISTINCT_VALUES = 1000
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+
+class BloomFilter:
+    """
+    A bloom filter of string values, serializable to JSON.
+    """
+
+    def __init__(self, num_bits, num_hashes, bits=None):
+        """
+        Parameters:
+            num_bits (int): Size of the filter in bits.
+            num_hashes (int): Number of bits set per value.
+            bits (bytearray): Content of the filter, empty if not set.
+        """
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate=BLOOM_FALSE_POSITIVE_RATE):
+        """
+        Returns an empty filter sized for capacity values.
+
+        Parameters:
+            capacity (int): Expected number of values.
+            false_positive_rate (float): Expected rate of false positives.
+
+        Returns:
+            BloomFilter: The filter.
+        """
+        capacity = max(1, capacity)
+        num_bits = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, value):
+        """Returns the bits of a value, by double hashing."""
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        return [(first + i * second) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, value):
+        """Adds a value to the filter."""
+        for position in self._positions(value):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, value):
+        return all(self.bits[position // 8] & (1 << (position % 8))
+                   for position in self._positions(value))
+
+    def to_dict(self):
+        """Returns the filter as a JSON serializable dictionary."""
+        return {'bits': self.num_bits, 'hashes': self.num_hashes,
+                'data': base64.b64encode(bytes(self.bits)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restores a filter returned by to_dict."""
+        return cls(data['bits'], data['hashes'], bytearray(base64.b64decode(data['data'])))
+
+
+def _columns(data):
+    """
+    Yields the columns of a DataFrame or Arrow table as Arrow arrays, one at a time.
+    Columns that Arrow cannot convert, e.g. with mixed types, are skipped.
+    """
+    if isinstance(data, pa.Table):
+        yield from zip(data.column_names, data.columns)
+        return
+    for name in data.columns:
+        try:
+            yield name, pa.array(data[name], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            continue
+
+
+def _min_max(values):
+    """Returns the min and max of a numeric, string or temporal column, or None."""
+    if not (pa.types.is_integer(values.type) or pa.types.is_floating(values.type)
+            or pa.types.is_string(values.type) or pa.types.is_temporal(values.type)):
+        return None
+    min_max = pc.min_max(values)  # pylint: disable=E1101
+    minimum, maximum = min_max['min'].as_py(), min_max['max'].as_py()
+    if minimum is None:
+        return None
+    if pa.types.is_temporal(values.type):
+        minimum, maximum = minimum.isoformat(), maximum.isoformat()
+    return {'min': minimum, 'max': maximum}
+
+
+def _merge_min_max(current, min_max):
+    """Returns the min/max covering both a min/max and the one of another chunk."""
+    if current is None or min_max is None:
+        return current or min_max
+    return {'min': min(current['min'], min_max['min']),
+            'max': max(current['max'], min_max['max'])}
+
+
+def _add_chunk(chunk, config, min_maxes, distinct_values):
+    """
+    Adds the min/max of the columns of a chunk, and the distinct values of its indexed
+    columns, to the ones collected from the previous chunks.
+    """
+    indexed = config.get('index_distinct', []) + config.get('index_bloom', [])
+    for column, values in _columns(chunk):
+        min_maxes[column] = _merge_min_max(min_maxes.get(column), _min_max(values))
+        if column not in indexed:
+            continue
+        distinct = distinct_values.setdefault(column, set())
+        # Only bloom filters need the values of high cardinality columns.
+        if column in config.get('index_bloom', []) or len(distinct) <= MAX_DISTINCT_VALUES:
+            distinct.update(values.unique().drop_null().to_pylist())
+
+
+def file_entry(name, data, config):
+    """
+    Builds the manifest entry of a parquet file, with its query index. A file written
+    batch by batch is read back one row group at a time, so only the stats and the
+    distinct values of the indexed columns are kept in memory.
+
+    Parameters:
+        name (str): Name of the file.
+        data (DataFrame | pa.Table | BatchedParquetFile | pq.ParquetFile): Content of
+                                                                         the file.
+        config (dict): Configuration dictionary with the 'index_distinct' and
+                       'index_bloom' columns.
+
+    Returns:
+        dict: The entry with the 'name', 'rows', 'columns' min/max, 'distinct' values
+              and 'bloom' filters of the file.
+    """
+    entry = {'name': name, 'rows': 0, 'columns': {}, 'distinct': {}, 'bloom': {}}
+    min_maxes, distinct_values = {}, {}
+    if isinstance(data, BatchedParquetFile):
+        chunks = data.iter_row_groups()
+    elif isinstance(data, pq.ParquetFile):
+        chunks = (data.read_row_group(index) for index in range(data.num_row_groups))
+    else:
+        chunks = [data]
+    for chunk in chunks:
+        entry['rows'] += len(chunk)
+        _add_chunk(chunk, config, min_maxes, distinct_values)
+    entry['columns'] = {
+        column: min_max for column, min_max in min_maxes.items() if min_max is not None}
+    for column, distinct in distinct_values.items():
+        if column in config.get('index_distinct', []) and len(distinct) <= MAX_DISTINCT_VALUES:
+            entry['distinct'][column] = sorted(str(value) for value in distinct)
+        if column in config.get('index_bloom', []):
+            bloom_filter = BloomFilter.for_capacity(len(distinct))
+            for value in distinct:
+                bloom_filter.add(value)
+            entry['bloom'][column] = bloom_filter.to_dict()
+    return entry
+
+
+def replaced_files(storage, config):
+    """
+    Returns the files of the partition that an export of config['window'] replaces: the
+    files listed in the manifest that only hold data of the window, e.g. the outputs of
+    a compaction of the window's files.
+
+    Parameters:
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the dataset.
+
+    Returns:
+        list | None: Names of the replaced files, None if the manifest could not be read,
+                     or if files hold data of the window and of other windows.
+    """
+    name = config.get('file_name', 'k8s_opencost.parquet')
+    try:
+        manifest = read_manifest(storage, config) or new_manifest()
+    except ManifestError as err:
+        print(err)
+        return None
+    covered, mixed = window_files(manifest, name, config['window'])
+    if mixed:
+        print(f"{', '.join(mixed)} also hold data of other windows than "
+              f"{config['window']}, export or replay the whole day instead.")
+        return None
+    return covered
+
+
+def index_file(storage, config, data, replaced=()):
+    """
+    Adds the exported file of config['file_name'] to the manifest of its partition,
+    with its query index and export window. A file written again is live again, even
+    if it was replaced by a compaction.
+
+    Parameters:
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the dataset.
+        data (DataFrame | pa.Table | BatchedParquetFile): The exported data.
+        replaced (list): Names of the files the exported file replaces, from
+                         replaced_files. They are marked as replaced in the manifest.
+
+    Returns:
+        dict | None: The manifest, None if it could not be saved.
+    """
+    name = config.get('file_name', 'k8s_opencost.parquet')
+    try:
+        manifest = read_manifest(storage, config) or new_manifest()
+    except ManifestError as err:
+        print(err)
+        return None
+    entry = file_entry(name, data, config)
+    if 'window' in config:
+        entry['windows'] = [config['window']]
+    manifest['files'] = [listed for listed in manifest['files']
+                         if listed['name'] != name and listed['name'] not in replaced]
+    manifest['files'].append(entry)
+    manifest['replaced'] = sorted(
+        {replaced_name for replaced_name in manifest['replaced'] if replaced_name != name}
+        | set(replaced))
+    if write_manifest(manifest, storage, config) is None:
+        return None
+    return manifest
+
+
+def _overlaps(min_max, low, high):
+    """Returns False if [low, high] is outside of min_max, True if it is not comparable."""
+    try:
+        return not ((low is not None and min_max['max'] < low)
+                    or (high is not None and min_max['min'] > high))
+    except TypeError:
+        return True
+
+
+def file_matches(entry, equals=None, ranges=None):
+    """
+    Returns False if the manifest entry shows the file has no matching row. Conditions
+    on columns without index are assumed to match.
+
+    Parameters:
+        entry (dict): Manifest entry of the file.
+        equals (dict): Values of columns, e.g. {'properties.namespace': 'kube-system'}.
+        ranges (dict): (low, high) bounds of columns, None for an open bound, e.g.
+                       {'totalCost': (100.0, None)}.
+
+    Returns:
+        bool: True if the file may have matching rows.
+    """
+    columns = entry.get('columns', {})
+    for column, value in (equals or {}).items():
+        if column in entry.get('distinct', {}):
+            if str(value) not in entry['distinct'][column]:
+                return False
+        elif column in entry.get('bloom', {}):
+            if value not in BloomFilter.from_dict(entry['bloom'][column]):
+                return False
+        elif column in columns and not _overlaps(columns[column], value, value):
+            return False
+    for column, (low, high) in (ranges or {}).items():
+        if column in columns and not _overlaps(columns[column], low, high):
+            return False
+    return True
+
+
+def _prune_partition(storage, config, equals, ranges):
+    """
+    Returns the live parquet files of a partition that may have matching rows.
+
+    Parameters:
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the partition.
+        equals (dict): Values of columns, see file_matches.
+        ranges (dict): (low, high) bounds of columns, see file_matches.
+
+    Returns:
+        list: Names of the files to read.
+
+    Raises:
+        ManifestError: If the manifest of the partition cannot be read.
+    """
+    file_names = storage.list_files(config)
+    manifest = read_manifest(storage, config, file_names) or new_manifest()
+    entries = {entry['name']: entry for entry in manifest['files']}
+    return [name for name in live_files(manifest, file_names)
+            if name not in entries or file_matches(entries[name], equals, ranges)]
+
+
+# pylint: disable=R0913
+def prune_files(storage, config, start, end, equals=None, ranges=None):
+    """
+    Returns the parquet files of the partitions between two days that may have rows
+    matching the conditions, using the manifests only. Files without index entry,
+    e.g. in partitions without manifest, are always returned, and files replaced by a
+    compaction never are.
+
+    Parameters:
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the dataset.
+        start (str): First day (YYYY-MM-DD).
+        end (str): Last day (YYYY-MM-DD), included.
+        equals (dict): Values of columns, see file_matches.
+        ranges (dict): (low, high) bounds of columns, see file_matches.
+
+    Returns:
+        list: (day, file name) of the files to read.
+
+    Raises:
+        ManifestError: If the manifest of a partition cannot be read.
+    """
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    files = []
+    for days in range((last - first).days + 1):
+        day = (first + timedelta(days)).isoformat()
+        day_config = dict(config, window_start=f"{day}T00:00:00Z")
+        files += [(day, name) for name in _prune_partition(storage, day_config, equals, ranges)]
+    return files
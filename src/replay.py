@@ -0,0 +1,196 @@
+"""
+This module provides the offline replay of the OpenCost parquet export.
+
+It processes the raw API responses saved by the export (OPENCOST_PARQUET_RECORD_RAW)
+again, without querying OpenCost, and saves the result through the configured storage
+backend. Several days are replayed in parallel, one process per day.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import os
+import sys
+import zlib
+from datasets import extract_splits, get_dataset_config, is_window_file_name
+from manifest import (ManifestError, delete_replaced, live_files, new_manifest, read_manifest,
+                      write_manifest)
+from opencost_parquet_exporter import get_config, process_dataset, write_result
+from profiler import Profiler
+from query_index import index_file
+from storage_factory import get_storage
+from transfer import decode_payload
+
+RAW_FILE_PREFIX = '_raw_'
+
+
+def get_replay_config(replay_start=None, replay_end=None, replay_workers=None, **kwargs):
+    """
+    Get configuration for the replay based on either provided parameters or
+    environment variables.
+
+    Parameters:
+    - replay_start (str): First day to replay (YYYY-MM-DD), defaults to the
+                          'OPENCOST_PARQUET_REPLAY_START' environment variable, or the day
+                          of the export window if not set.
+    - replay_end (str): Last day to replay (YYYY-MM-DD), included, defaults to the
+                        'OPENCOST_PARQUET_REPLAY_END' environment variable, or replay_start
+                        if not set.
+    - replay_workers (int): Number of days replayed in parallel, defaults to the
+                            'OPENCOST_PARQUET_REPLAY_WORKERS' environment variable, or the
+                            number of CPUs if not set.
+    - kwargs: Parameters passed to get_config, e.g. file_key_prefix.
+
+    Returns:
+    - dict: The export configuration with 'replay_days' and 'replay_workers'.
+    """
+    config = get_config(**kwargs)
+    if replay_start is None:
+        replay_start = os.environ.get(
+            'OPENCOST_PARQUET_REPLAY_START', config['window_start'][:10])
+    if replay_end is None:
+        replay_end = os.environ.get('OPENCOST_PARQUET_REPLAY_END', replay_start)
+    if replay_workers is None:
+        replay_workers = int(os.environ.get(
+            'OPENCOST_PARQUET_REPLAY_WORKERS', os.cpu_count() or 1))
+    start, end = date.fromisoformat(replay_start), date.fromisoformat(replay_end)
+    config['replay_days'] = [
+        (start + timedelta(days)).isoformat() for days in range((end - start).days + 1)]
+    config['replay_workers'] = replay_workers
+    return config
+
+
+def read_raw_result(storage, config):
+    """
+    Reads the raw API response of a dataset saved in its partition.
+
+    Parameters:
+    - storage (BaseStorage): The storage backend.
+    - config (dict): Configuration dictionary of the dataset.
+
+    Returns:
+    - list or None: The splits of the response, or None if no raw response could be read.
+    """
+    prefix = f"{RAW_FILE_PREFIX}{config['dataset']}.json"
+    file_names = [name for name in storage.list_files(config) if name.startswith(prefix)]
+    if not file_names:
+        print(f"No raw {config['dataset']} response for {config['window_start'][:10]}")
+        return None
+    data = storage.read_file(file_names[0], config)
+    if data is None:
+        return None
+    try:
+        return extract_splits(config['dataset'], decode_payload(data, file_names[0])['data'])
+    except (ValueError, KeyError, zlib.error) as err:
+        print(f"Invalid raw response {file_names[0]}: {err}")
+        return None
+
+
+def replace_live_files(storage, config):
+    """
+    Makes the replayed file the only live file of the dataset in its partition. The
+    other files listed in the manifest, e.g. the outputs of a compaction of the day, and
+    the exports of shorter windows hold the data the replay recomputed: they are marked
+    as replaced in the manifest, then deleted, so their rows are not counted twice.
+    Other parquet files, e.g. written by other tools, are left as they are.
+
+    Parameters:
+    - storage (BaseStorage): The storage backend.
+    - config (dict): Configuration dictionary of the dataset.
+
+    Returns:
+    - bool: True if the manifest could be saved.
+    """
+    name = config.get('file_name', 'k8s_opencost.parquet')
+    file_names = storage.list_files(config)
+    try:
+        manifest = read_manifest(storage, config, file_names) or new_manifest()
+    except ManifestError as err:
+        print(err)
+        return False
+    excluded = name in manifest['replaced'] or name in manifest['pending']
+    manifest['replaced'] = [replaced for replaced in manifest['replaced'] if replaced != name]
+    manifest['pending'] = [pending for pending in manifest['pending'] if pending != name]
+    listed = [entry['name'] for entry in manifest['files']]
+    stale = [live for live in live_files(manifest, file_names)
+             if live != name and (live in listed or is_window_file_name(live, name))]
+    if not stale and not excluded:
+        return True
+    manifest['files'] = [entry for entry in manifest['files'] if entry['name'] not in stale]
+    manifest['replaced'] = sorted(set(manifest['replaced']) | set(stale))
+    if write_manifest(manifest, storage, config) is None:
+        return False
+    delete_replaced(manifest, stale, storage, config)
+    return True
+
+
+def replay_day(config, day):
+    """
+    Processes the raw responses of every dataset of a day and saves the result, in place
+    of the live files of their partitions.
+
+    Parameters:
+    - config (dict): Configuration dictionary from get_replay_config.
+    - day (str): The day to replay (YYYY-MM-DD).
+
+    Returns:
+    - bool: True if every dataset of the day was replayed.
+    """
+    # Storage clients are not shared between processes.
+    storage = get_storage(storage_backend=config['storage_backend'])
+    day_config = dict(config, window_start=f"{day}T00:00:00Z",
+                      window=f"{day}T00:00:00Z,{day}T23:59:59Z")
+    for dataset in config['datasets']:
+        dataset_config = get_dataset_config(day_config, dataset)
+        result = read_raw_result(storage, dataset_config)
+        if result is None:
+            return False
+        processed_data = process_dataset(dataset_config, result, storage, Profiler())
+        del result
+        if processed_data is None or write_result(
+                processed_data, dataset_config, storage) is None:
+            print(f"Failed to replay {dataset} for {day}")
+            return False
+        if dataset_config['index'] and index_file(
+                storage, dataset_config, processed_data) is None:
+            print(f"Failed to index {dataset} for {day}")
+            return False
+        if not replace_live_files(storage, dataset_config):
+            print(f"Failed to replace the files of {dataset} for {day}")
+            return False
+        print(f"Replayed {dataset} for {day}")
+    return True
+
+
+def replay(config):
+    """
+    Replays every configured day, config['replay_workers'] days at a time.
+
+    Parameters:
+    - config (dict): Configuration dictionary from get_replay_config.
+
+    Returns:
+    - list: The days that failed.
+    """
+    days = config['replay_days']
+    if config['replay_workers'] <= 1 or len(days) <= 1:
+        replayed = [replay_day(config, day) for day in days]
+    else:
+        with ProcessPoolExecutor(max_workers=config['replay_workers']) as pool:
+            replayed = list(pool.map(replay_day, [config] * len(days), days))
+    return [day for day, ok in zip(days, replayed) if not ok]
+
+# pylint: disable=C0116
+
+
+def main():
+    print("Starting replay")
+    config = get_replay_config()
+    print(f"Replaying {len(config['replay_days'])} days of {', '.join(config['datasets'])}")
+    failed = replay(config)
+    if failed:
+        print(f"Replay failed for: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+This module provides a versioned output schema for the OpenCost parquet export and
+the flatten plans compiled from it.
+
+A schema lists every output column with the path of the value in the allocation
+and its data type. It is computed once, stored as JSON through the storage backend and
+reused for every export, so the parquet schema stays stable when OpenCost adds or omits
+fields.
+"""
+
+import json
+import os
+
+
+def _infer_type(value):
+    """
+    Infers the data type of a JSON value, as a name accepted by both engines.
+
+    Parameters:
+        value: A leaf value of an allocation.
+
+    Returns:
+        str | None: 'boolean', 'float' or 'string', None for nulls and lists.
+    """
+    if isinstance(value, bool):
+        return 'boolean'
+    # JSON numbers are exported as floats, so nulls never change the column type.
+    if isinstance(value, (int, float)):
+        return 'float'
+    if isinstance(value, str):
+        return 'string'
+    return None
+
+
+def _leaf_paths(value, prefix, paths):
+    """
+    Collects the paths of all leaf values of a nested dictionary, with the type of
+    their first non-null value.
+
+    Parameters:
+        value (dict): The nested dictionary.
+        prefix (tuple): Path of the dictionary itself.
+        paths (dict): Collected paths and their inferred type, in insertion order.
+    """
+    for key, child in value.items():
+        path = prefix + (key,)
+        if isinstance(child, dict):
+            # Empty dictionaries do not produce a column, same as pandas.json_normalize.
+            _leaf_paths(child, path, paths)
+        elif paths.get(path) is None:
+            paths[path] = _infer_type(child)
+
+
+def sample_values(result, paths):
+    """
+    Finds the first value of each path that is not null nor an empty list, e.g. to type
+    the columns that discover_schema leaves untyped.
+
+    Parameters:
+        result (list): Splits of the OpenCost API response.
+        paths (list): Paths of the values, as tuples of keys.
+
+    Returns:
+        dict: The first value of every path that has one.
+    """
+    samples = {}
+    missing = set(paths)
+    for split in result:
+        for allocation in split.values():
+            for path in list(missing):
+                value = allocation
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+                if value is not None and value != []:
+                    samples[path] = value
+                    missing.discard(path)
+            if not missing:
+                return samples
+    return samples
+
+
+def discover_schema(result, rename_cols, data_types, sep='.', version=1):
+    """
+    Computes an output schema from the allocations of an OpenCost API response.
+
+    Parameters:
+        result (list): Splits of the OpenCost API response.
+        rename_cols (dict): Key-value pairs for columns to rename.
+        data_types (dict): Data types for properties of OpenCost response.
+        sep (str): Separator used to join nested keys into column names.
+        version (int): Version of the schema.
+
+    Returns:
+        dict: The schema, with a 'version' and a list of 'columns', each with a
+              'name', a 'path' and a 'type'. Columns without data type get the type of
+              their values, so they keep it on days they are missing from the data.
+              The type is None for columns that only hold nulls or lists.
+    """
+    paths = {}
+    for split in result:
+        for allocation in split.values():
+            _leaf_paths(allocation, (), paths)
+    columns = []
+    for path, inferred_type in paths.items():
+        name = rename_cols.get(sep.join(path), sep.join(path))
+        columns.append(
+            {'name': name, 'path': list(path), 'type': data_types.get(name, inferred_type)})
+    names = {column['name'] for column in columns}
+    sources = {name: source for source, name in rename_cols.items()}
+    # Typed columns that are absent from this response are still part of the schema.
+    for name, dtype in data_types.items():
+        if name not in names:
+            columns.append(
+                {'name': name, 'path': sources.get(name, name).split(sep), 'type': dtype})
+    return {'version': version, 'columns': columns}
+
+
+def evolve_schema(schema, result, rename_cols, data_types, sep='.'):
+    """
+    Adds the fields of the allocations that are not part of a schema, as a new version.
+
+    Parameters:
+        schema (dict): The schema.
+        result (list): Splits of the OpenCost API response.
+        rename_cols (dict): Key-value pairs for columns to rename.
+        data_types (dict): Data types for properties of OpenCost response.
+        sep (str): Separator used to join nested keys into column names.
+
+    Returns:
+        dict: The schema with the new columns appended and its version increased, or
+              the schema itself if every field is already part of it.
+    """
+    names = {column['name'] for column in schema['columns']}
+    paths = {tuple(column['path']) for column in schema['columns']}
+    new_columns = [
+        column for column in discover_schema(result, rename_cols, data_types, sep)['columns']
+        if column['name'] not in names and tuple(column['path']) not in paths]
+    if not new_columns:
+        return schema
+    return {'version': schema['version'] + 1, 'columns': schema['columns'] + new_columns}
+
+
+def load_schema(file_path):
+    """
+    Loads a schema provided as a local file, for example mounted from a ConfigMap.
+
+    Parameters:
+        file_path (str): The path to the schema file.
+
+    Returns:
+        dict: The schema.
+    """
+    with open(file_path, 'r', encoding="utf-8") as file:
+        return json.load(file)
+
+
+def read_schema(storage, config, file_names=None):
+    """
+    Reads the schema of the export through the storage backend, at the root of the
+    export prefix.
+
+    Parameters:
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the export, including 'schema_file'.
+        file_names (list): Names of the files at the root of the export prefix, listed
+                           if not provided.
+
+    Returns:
+        dict | None: The schema, or None if it is not stored or could not be read.
+    """
+    file_name = os.path.basename(config['schema_file'])
+    if file_names is None:
+        file_names = storage.list_files(config, partition=False)
+    if file_name not in file_names:
+        return None
+    data = storage.read_file(file_name, config, partition=False)
+    if data is None:
+        return None
+    return json.loads(data)
+
+
+def write_schema(schema, storage, config):
+    """
+    Writes the schema of the export through the storage backend, at the root of the
+    export prefix, so every run and every replay uses the same schema.
+
+    Parameters:
+        schema (dict): The schema.
+        storage (BaseStorage): The storage backend.
+        config (dict): Configuration dictionary of the export, including 'schema_file'.
+
+    Returns:
+        str | None: The location of the schema, or None if it could not be written.
+    """
+    return storage.save_file(
+        json.dumps(schema, indent=4).encode('utf-8'),
+        os.path.basename(config['schema_file']), config, partition=False)
+
+
+class FlattenPlan:
+    """
+    A schema compiled into a tree of allocation keys, where every leaf holds the index
+    of its output column. Flattening an allocation only visits the keys of the schema,
+    without discovering the keys of every allocation.
+    """
+
+    def __init__(self, schema, drift='report'):
+        """
+        Parameters:
+            schema (dict): The schema, as returned by discover_schema.
+            drift (str): What to do with fields that are not in the schema,
+                         'drop' them silently, or 'report' and drop them. With 'evolve',
+                         they were added to the schema before it was compiled.
+        """
+        self.version = schema['version']
+        self.drift = drift
+        self.columns = [column['name'] for column in schema['columns']]
+        self.data_types = {
+            column['name']: column['type']
+            for column in schema['columns'] if column['type'] is not None}
+        self.tree = {}
+        for index, column in enumerate(schema['columns']):
+            node = self.tree
+            for key in column['path'][:-1]:
+                node = node.setdefault(key, {})
+                if not isinstance(node, dict):
+                    # A leaf and a nested field share this path, the first one wins.
+                    break
+            else:
+                node[column['path'][-1]] = index
+        self.plan = self._compile(self.tree)
+        self.known_keys = self._compile_keys(self.tree)
+
+    def _compile(self, tree):
+        """
+        Converts the tree into nested tuples of (key, column index, children).
+        """
+        return tuple(
+            (key, node, ()) if isinstance(node, int) else (key, None, self._compile(node))
+            for key, node in tree.items())
+
+    def _compile_keys(self, tree):
+        """
+        Converts the tree into nested tuples of (known keys, nested children).
+        """
+        return (frozenset(tree), tuple(
+            (key, self._compile_keys(node))
+            for key, node in tree.items() if isinstance(node, dict)))
+
+    def _find_new_fields(self, known_keys, value, prefix, paths):
+        """
+        Collects the paths of the fields of a nested dictionary that are not in the tree.
+        """
+        keys, children = known_keys
+        if not value.keys() <= keys:
+            for key in value.keys() - keys:
+                if isinstance(value[key], dict):
+                    _leaf_paths(value[key], prefix + (key,), paths)
+                else:
+                    paths[prefix + (key,)] = None
+        for key, child_keys in children:
+            child = value.get(key)
+            if isinstance(child, dict):
+                self._find_new_fields(child_keys, child, prefix + (key,), paths)
+
+    def _fill(self, plan, value, row):
+        """
+        Copies the values of the plan's keys from a nested dictionary into the row.
+        """
+        for key, index, children in plan:
+            child = value.get(key)
+            if index is not None:
+                row[index] = child
+            elif isinstance(child, dict):
+                self._fill(children, child, row)
+
+    def flatten(self, allocations):
+        """
+        Flattens allocations into columns. Fields missing from an allocation are None.
+
+        Parameters:
+            allocations: Iterable of (nested) allocation dictionaries.
+
+        Returns:
+            dict: Column name to list of values, in schema order.
+        """
+        width = len(self.columns)
+        rows = []
+        for allocation in allocations:
+            row = [None] * width
+            self._fill(self.plan, allocation, row)
+            rows.append(row)
+        if not rows:
+            return {name: [] for name in self.columns}
+        return dict(zip(self.columns, (list(values) for values in zip(*rows))))
+
+    def new_fields(self, result):
+        """
+        Finds the fields of the allocations that are not part of the schema.
+
+        Parameters:
+            result (list): Splits of the OpenCost API response.
+
+        Returns:
+            list: Paths of the new fields, as tuples of keys.
+        """
+        paths = {}
+        for split in result:
+            for allocation in split.values():
+                self._find_new_fields(self.known_keys, allocation, (), paths)
+        return list(paths)
@@ -3,7 +3,9 @@ This module provides an implementation of the BaseStorage class for Amazon S3.
 """
 
 import os
+import shutil
 import pandas as pd
+from pyarrow import fs
 from botocore.exceptions import ClientError, PartialCredentialsError, NoCredentialsError
 from .base_storage import BaseStorage
 
@@ -17,34 +19,66 @@ class S3Storage(BaseStorage):
 
     """
 
+    def _get_filesystem(self, file_name, config, partition=True):
+        """
+        Returns the pyarrow filesystem and the path of a file inside the export partition.
+
+        Parameters:
+            file_name (str): Name of the file inside the partition, '' for the partition.
+            config (dict): Configuration information including the S3 bucket name, object key
+                           prefix and the 'window_start' datetime.
+            partition (bool): If False, the file is at the root of the object key prefix.
+
+        Returns:
+            tuple: The pyarrow FileSystem and the path of the file in it.
+        """
+        return fs.FileSystem.from_uri(self._get_uri(file_name, config, partition).rstrip('/'))
+
+    def _get_uri(self, file_name, config, partition=True) -> str:
+        """
+        Builds the URI of a file inside the export partition, creating the local
+        directory when no S3 bucket is configured.
+
+        Parameters:
+            file_name (str): Name of the file inside the partition.
+            config (dict): Configuration information including the S3 bucket name, object key
+                           prefix and the 'window_start' datetime.
+            partition (bool): If False, the file is at the root of the object key prefix.
+
+        Returns:
+            str: An s3:// or file:// URI.
+        """
+        if partition:
+            window = pd.to_datetime(config['window_start'])
+            # pylint: disable=C0301
+            parquet_prefix = f"{config['file_key_prefix']}/year={window.year}/month={window.month}/day={window.day}"
+        else:
+            parquet_prefix = config['file_key_prefix'].rstrip('/')
+        if config.get('s3_bucket'):
+            return f"s3://{config['s3_bucket']}/{parquet_prefix}/{file_name}"
+        path = '/'+parquet_prefix
+        os.makedirs(path, 0o750, exist_ok=True)
+        return f"file://{parquet_prefix}/{file_name}"
+
     def save_data(self, data, config) -> str | None:
         """
         Uploads the provided data to an Amazon S3 bucket using the specified configuration.
 
         Parameters:
-            data (DataFrame): The data to be uploaded. 
+            data (DataFrame): The data to be uploaded.
                               Should be a file-like object (BytesIO, for example).
-            config (dict): Configuration information including the S3 bucket name, object key 
-                           prefix,and the 'window_start' datetime that influences the object's 
+            config (dict): Configuration information including the S3 bucket name, object key
+                           prefix,and the 'window_start' datetime that influences the object's
                            key structure.
 
         Returns:
             str | None: The full S3 object path if the upload is successful, None otherwise.
 
         """
-        file_name = 'k8s_opencost.parquet'
-        window = pd.to_datetime(config['window_start'])
-        # pylint: disable=C0301
-        parquet_prefix = f"{config['file_key_prefix']}/year={window.year}/month={window.month}/day={window.day}"
+        file_name = config.get('file_name', 'k8s_opencost.parquet')
 
         try:
-            if config['s3_bucket']:
-                uri = f"s3://{config['s3_bucket']}/{parquet_prefix}/{file_name}"
-            else:
-                uri = f"file://{parquet_prefix}/{file_name}"
-                path = '/'+parquet_prefix
-                os.makedirs(path, 0o750, exist_ok=True)
-
+            uri = self._get_uri(file_name, config)
             data.to_parquet(uri)
 
             return uri
@@ -65,3 +99,107 @@ class S3Storage(BaseStorage):
         except ClientError as ce:
             print(f"AWS Client Error: {ce}")
         return None
+
+    def save_file(self, data, file_name, config, partition=True) -> str | None:
+        """
+        Writes an auxiliary file next to the exported parquet file.
+
+        Parameters:
+            data (bytes | file-like): The content of the file.
+            file_name (str): Name of the file inside the partition.
+            config (dict): Configuration information including the S3 bucket name, object key
+                           prefix and the 'window_start' datetime.
+            partition (bool): If False, the file is saved at the root of the object key prefix.
+
+        Returns:
+            str | None: The full object path if the upload is successful, None otherwise.
+        """
+        try:
+            uri = self._get_uri(file_name, config, partition)
+            filesystem, path = fs.FileSystem.from_uri(uri)
+            with filesystem.open_output_stream(path) as stream:
+                if isinstance(data, bytes):
+                    stream.write(data)
+                else:
+                    shutil.copyfileobj(data, stream)
+            return uri
+        except KeyError as ke:
+            print(f"Missing configuration key: {ke}")
+        except ValueError as ve:
+            print(f"Error parsing date format: {ve}")
+        except OSError as oe:
+            print(f"Error writing {file_name}: {oe}")
+        return None
+
+    def list_files(self, config, partition=True) -> list:
+        """
+        Lists the files of the export partition.
+
+        Parameters:
+            config (dict): Configuration information including the S3 bucket name, object key
+                           prefix and the 'window_start' datetime.
+            partition (bool): If False, lists the files at the root of the object key prefix.
+
+        Returns:
+            list: Names of the files inside the partition.
+        """
+        try:
+            filesystem, path = self._get_filesystem('', config, partition)
+            infos = filesystem.get_file_info(fs.FileSelector(path, allow_not_found=True))
+            return sorted(info.base_name for info in infos if info.type == fs.FileType.File)
+        except KeyError as ke:
+            print(f"Missing configuration key: {ke}")
+        except ValueError as ve:
+            print(f"Error parsing date format: {ve}")
+        except OSError as oe:
+            print(f"Error listing files: {oe}")
+        return []
+
+    def read_file(self, file_name, config, partition=True) -> bytes | None:
+        """
+        Reads a file of the export partition.
+
+        Parameters:
+            file_name (str): Name of the file inside the partition.
+            config (dict): Configuration information including the S3 bucket name, object key
+                           prefix and the 'window_start' datetime.
+            partition (bool): If False, the file is read from the root of the object key prefix.
+
+        Returns:
+            bytes | None: The content of the file, None if it could not be read.
+        """
+        try:
+            filesystem, path = self._get_filesystem(file_name, config, partition)
+            with filesystem.open_input_stream(path) as stream:
+                return stream.read()
+        except KeyError as ke:
+            print(f"Missing configuration key: {ke}")
+        except ValueError as ve:
+            print(f"Error parsing date format: {ve}")
+        except OSError as oe:
+            print(f"Error reading {file_name}: {oe}")
+        return None
+
+    def delete_file(self, file_name, config) -> bool:
+        """
+        Deletes a file of the export partition.
+
+        Parameters:
+            file_name (str): Name of the file inside the partition.
+            config (dict): Configuration information including the S3 bucket name, object key
+                           prefix and the 'window_start' datetime.
+
+        Returns:
+            bool: True if the file was deleted.
+        """
+        try:
+            filesystem, path = self._get_filesystem(file_name, config)
+            filesystem.delete_file(path)
+            return True
+        except KeyError as ke:
+            print(f"Missing configuration key: {ke}")
+        except ValueError as ve:
+            print(f"Error parsing date format: {ve}")
+        except OSError as oe:
+            print(f"Error deleting {file_name}: {oe}")
+        return False
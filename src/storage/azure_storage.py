@@ -26,21 +26,24 @@ class AzureStorage(BaseStorage):
 
     """
 
-    def save_data(self, data: pd.core.frame.DataFrame, config) -> str | None:
+    def __init__(self):
+        self._container_client = None
+
+    def _get_container_client(self, config):
         """
-        Saves a DataFrame to Azure Blob Storage.
+        Returns a client for the configured container. The client is created once and
+        shared by all operations of this instance.
 
         Parameters:
-            data (pd.core.frame.DataFrame): The DataFrame to be saved.
-            config (dict): Configuration dictionary containing necessary information for storage.
-                           Expected keys include 'azure_tenant', 'azure_application_id', 
-                           'azure_application_secret', 'azure_storage_account_name', 
-                           'azure_container_name', and 'file_key_prefix'.
+            config (dict): Configuration dictionary containing 'azure_tenant',
+                           'azure_application_id', 'azure_application_secret',
+                           'azure_storage_account_name' and 'azure_container_name'.
 
         Returns:
-            str | None: The URL of the saved blob if successful, None otherwise.
-
+            ContainerClient: A client for the container.
         """
+        if self._container_client is not None:
+            return self._container_client
         credentials = ClientSecretCredential(
             config['azure_tenant'],
             config['azure_application_id'],
@@ -51,22 +54,83 @@ class AzureStorage(BaseStorage):
             logging_enable=True,
             credential=credentials
         )
+        self._container_client = blob_service_client.get_container_client(
+            config['azure_container_name'])
+        return self._container_client
+
+    def _get_prefix(self, config, partition=True) -> str:
+        """
+        Returns the key prefix of the export partition.
+
+        Parameters:
+            config (dict): Configuration dictionary containing 'file_key_prefix'
+                           and 'window_start'.
+            partition (bool): If False, returns the root of the export prefix.
 
-        # TODO: Force overwrite? As of now upload would fail since key is the same.
-        # blob_client provides an option for this
-        file_name = 'k8s_opencost.parquet'
+        Returns:
+            str: The key prefix, without a trailing slash.
+        """
+        if not partition:
+            return config['file_key_prefix'].rstrip('/')
         window = pd.to_datetime(config['window_start'])
-        parquet_prefix = f"{config['file_key_prefix']}{window.year}/{window.month}/{window.day}"
-        key = f"{parquet_prefix}/{file_name}"
-        blob_client = blob_service_client.get_blob_client(
-            container=config['azure_container_name'], blob=key)
+        return f"{config['file_key_prefix']}{window.year}/{window.month}/{window.day}"
+
+    def _get_blob_client(self, file_name, config, partition=True):
+        """
+        Returns a blob client for a file inside the export partition.
+
+        Parameters:
+            file_name (str): Name of the blob inside the partition.
+            config (dict): Configuration dictionary containing the Azure credentials,
+                           'azure_container_name', 'file_key_prefix' and 'window_start'.
+            partition (bool): If False, the file is at the root of the export prefix.
+
+        Returns:
+            BlobClient: A client for the requested blob.
+        """
+        key = f"{self._get_prefix(config, partition)}/{file_name}"
+        return self._get_container_client(config).get_blob_client(key)
+
+    def save_data(self, data: pd.core.frame.DataFrame, config) -> str | None:
+        """
+        Saves a DataFrame to Azure Blob Storage.
+
+        Parameters:
+            data (pd.core.frame.DataFrame): The DataFrame to be saved.
+            config (dict): Configuration dictionary containing necessary information for storage.
+                           Expected keys include 'azure_tenant', 'azure_application_id', 
+                           'azure_application_secret', 'azure_storage_account_name', 
+                           'azure_container_name', and 'file_key_prefix'.
+
+        Returns:
+            str | None: The URL of the saved blob if successful, None otherwise.
+
+        """
         parquet_file = BytesIO()
         data.to_parquet(parquet_file, engine='pyarrow', index=False)
         parquet_file.seek(0)
+        return self.save_file(
+            parquet_file, config.get('file_name', 'k8s_opencost.parquet'), config)
+
+    def save_file(self, data, file_name, config, partition=True) -> str | None:
+        """
+        Uploads an arbitrary file to the export partition in Azure Blob Storage,
+        replacing the blob if it exists, like the other storage backends.
+
+        Parameters:
+            data (bytes | file-like): The content of the blob.
+            file_name (str): Name of the blob inside the partition.
+            config (dict): Configuration dictionary containing necessary information for storage.
+            partition (bool): If False, the file is at the root of the export prefix.
+
+        Returns:
+            str | None: The URL of the saved blob if successful, None otherwise.
+        """
+        blob_client = self._get_blob_client(file_name, config, partition)
 
         try:
             response = blob_client.upload_blob(
-                data=parquet_file, blob_type=BlobType.BlockBlob)
+                data=data, blob_type=BlobType.BlockBlob, overwrite=True)
             if response:
                 return f"{blob_client.url}"
         # pylint: disable=W0718
@@ -74,3 +138,62 @@ class AzureStorage(BaseStorage):
             logger.error(e)
 
         return None
+
+    def list_files(self, config, partition=True) -> list:
+        """
+        Lists the blobs of the export partition.
+
+        Parameters:
+            config (dict): Configuration dictionary containing necessary information for storage.
+            partition (bool): If False, lists the files at the root of the export prefix.
+
+        Returns:
+            list: Names of the blobs inside the partition, relative to the partition.
+        """
+        prefix = f"{self._get_prefix(config, partition)}/"
+        try:
+            blobs = self._get_container_client(config).list_blobs(name_starts_with=prefix)
+            return sorted(blob.name[len(prefix):] for blob in blobs
+                          if '/' not in blob.name[len(prefix):])
+        # pylint: disable=W0718
+        except Exception as e:
+            logger.error(e)
+        return []
+
+    def read_file(self, file_name, config, partition=True) -> bytes | None:
+        """
+        Downloads a blob of the export partition.
+
+        Parameters:
+            file_name (str): Name of the blob inside the partition.
+            config (dict): Configuration dictionary containing necessary information for storage.
+            partition (bool): If False, the file is at the root of the export prefix.
+
+        Returns:
+            bytes | None: The content of the blob, None if it could not be read.
+        """
+        try:
+            return self._get_blob_client(file_name, config, partition).download_blob().readall()
+        # pylint: disable=W0718
+        except Exception as e:
+            logger.error(e)
+        return None
+
+    def delete_file(self, file_name, config) -> bool:
+        """
+        Deletes a blob of the export partition.
+
+        Parameters:
+            file_name (str): Name of the blob inside the partition.
+            config (dict): Configuration dictionary containing necessary information for storage.
+
+        Returns:
+            bool: True if the blob was deleted.
+        """
+        try:
+            self._get_blob_client(file_name, config).delete_blob()
+            return True
+        # pylint: disable=W0718
+        except Exception as e:
+            logger.error(e)
+        return False
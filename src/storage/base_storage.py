@@ -28,3 +28,59 @@ class BaseStorage(ABC):
             data: The data to be saved. 
             config: Configuration settings for the storage operation. 
         """
+
+    @abstractmethod
+    def save_file(self, data, file_name, config, partition=True):
+        """
+        Abstract method to save an arbitrary file next to the exported data.
+
+        This method must be implemented by subclasses to store auxiliary files
+        (for example profiling artifacts) in the same location as the export.
+
+        Parameters:
+            data: The file content, either bytes or a binary file-like object.
+            file_name: Name of the file inside the export location.
+            config: Configuration settings for the storage operation.
+            partition: If False, the file is saved at the root of the export prefix,
+                       shared by all partitions, instead of inside the partition.
+        """
+
+    @abstractmethod
+    def list_files(self, config, partition=True):
+        """
+        Abstract method to list the files stored in the export location.
+
+        Parameters:
+            config: Configuration settings for the storage operation.
+            partition: If False, lists the files at the root of the export prefix.
+
+        Returns:
+            list: Names of the files inside the export location.
+        """
+
+    @abstractmethod
+    def read_file(self, file_name, config, partition=True):
+        """
+        Abstract method to read a file from the export location.
+
+        Parameters:
+            file_name: Name of the file inside the export location.
+            config: Configuration settings for the storage operation.
+            partition: If False, the file is read from the root of the export prefix.
+
+        Returns:
+            bytes | None: The file content, or None if it could not be read.
+        """
+
+    @abstractmethod
+    def delete_file(self, file_name, config):
+        """
+        Abstract method to delete a file from the export location.
+
+        Parameters:
+            file_name: Name of the file inside the export location.
+            config: Configuration settings for the storage operation.
+
+        Returns:
+            bool: True if the file was deleted.
+        """
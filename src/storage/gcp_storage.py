@@ -20,9 +20,13 @@ class GCPStorage(BaseStorage):
     A class to handle data storage in Google Cloud Storage.
     """
 
+    def __init__(self):
+        self._client = None
+
     def _get_client(self, config) -> storage.Client:
         """
         Returns a Google Cloud Storage client using credentials provided in the config.
+        The client is created once and shared by all operations of this instance.
 
         Parameters:
             config (dict): Configuration dictionary that may contain 'gcp_credentials' 
@@ -31,6 +35,8 @@ class GCPStorage(BaseStorage):
         Returns:
             storage.Client: An authenticated Google Cloud Storage client.
         """
+        if self._client is not None:
+            return self._client
         if 'gcp_credentials' in config:
             credentials_info = config['gcp_credentials']
             credentials = service_account.Credentials.from_service_account_info(
@@ -40,8 +46,43 @@ class GCPStorage(BaseStorage):
             # Use default credentials
             client = storage.Client()
 
+        self._client = client
         return client
 
+    def _get_prefix(self, config, partition=True) -> str:
+        """
+        Returns the object name prefix of the export partition.
+
+        Parameters:
+            config (dict): Configuration dictionary containing 'file_key_prefix'
+                           and 'window_start'.
+            partition (bool): If False, returns the root of the export prefix.
+
+        Returns:
+            str: The prefix, without a trailing slash.
+        """
+        if not partition:
+            return config['file_key_prefix'].rstrip('/')
+        window = pd.to_datetime(config['window_start'])
+        return f"{config['file_key_prefix']}/{window.year}/{window.month}/{window.day}"
+
+    def _get_blob(self, file_name, config, partition=True):
+        """
+        Returns a blob handle for a file inside the export partition.
+
+        Parameters:
+            file_name (str): Name of the object inside the partition.
+            config (dict): Configuration dictionary containing 'gcp_bucket_name',
+                           'file_key_prefix' and 'window_start'.
+            partition (bool): If False, the file is at the root of the export prefix.
+
+        Returns:
+            storage.Blob: The blob handle.
+        """
+        client = self._get_client(config)
+        bucket = client.bucket(config['gcp_bucket_name'])
+        return bucket.blob(f"{self._get_prefix(config, partition)}/{file_name}")
+
     def save_data(self, data: pd.core.frame.DataFrame, config) -> str | None:
         """
         Saves a DataFrame to Google Cloud Storage.
@@ -55,23 +96,32 @@ class GCPStorage(BaseStorage):
         Returns:
             str | None: The URL of the saved object if successful, None otherwise.
         """
-        client = self._get_client(config)
-
-        file_name = 'k8s_opencost.parquet'
-        window = pd.to_datetime(config['window_start'])
-        blob_prefix = f"{config['file_key_prefix']}/{window.year}/{window.month}/{window.day}"
-        bucket_name = config['gcp_bucket_name']
-        blob_name = f"{blob_prefix}/{file_name}"
-
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
         parquet_file = BytesIO()
         data.to_parquet(parquet_file, engine='pyarrow', index=False)
         parquet_file.seek(0)
+        return self.save_file(
+            parquet_file, config.get('file_name', 'k8s_opencost.parquet'), config)
+
+    def save_file(self, data, file_name, config, partition=True) -> str | None:
+        """
+        Uploads an arbitrary file to the export partition in Google Cloud Storage.
+
+        Parameters:
+            data (bytes | file-like): The content of the object.
+            file_name (str): Name of the object inside the partition.
+            config (dict): Configuration dictionary containing necessary information for storage.
+            partition (bool): If False, the file is at the root of the export prefix.
+
+        Returns:
+            str | None: The URL of the saved object if successful, None otherwise.
+        """
+        blob = self._get_blob(file_name, config, partition)
+        if isinstance(data, bytes):
+            data = BytesIO(data)
 
         try:
             blob.upload_from_file(
-                parquet_file, content_type='application/octet-stream')
+                data, content_type='application/octet-stream')
             return blob.public_url
         except gcp_exceptions.BadRequest as e:
             logger.error("Bad Request Error: %s", e)
@@ -87,3 +137,59 @@ class GCPStorage(BaseStorage):
             logger.error("Google API Error: %s", e)
 
         return None
+
+    def list_files(self, config, partition=True) -> list:
+        """
+        Lists the objects of the export partition.
+
+        Parameters:
+            config (dict): Configuration dictionary containing necessary information for storage.
+            partition (bool): If False, lists the files at the root of the export prefix.
+
+        Returns:
+            list: Names of the objects inside the partition, relative to the partition.
+        """
+        prefix = f"{self._get_prefix(config, partition)}/"
+        try:
+            blobs = self._get_client(config).list_blobs(
+                config['gcp_bucket_name'], prefix=prefix, delimiter='/')
+            return sorted(blob.name[len(prefix):] for blob in blobs)
+        except gcp_exceptions.GoogleAPIError as e:
+            logger.error("Google API Error: %s", e)
+        return []
+
+    def read_file(self, file_name, config, partition=True) -> bytes | None:
+        """
+        Downloads an object of the export partition.
+
+        Parameters:
+            file_name (str): Name of the object inside the partition.
+            config (dict): Configuration dictionary containing necessary information for storage.
+            partition (bool): If False, the file is at the root of the export prefix.
+
+        Returns:
+            bytes | None: The content of the object, None if it could not be read.
+        """
+        try:
+            return self._get_blob(file_name, config, partition).download_as_bytes()
+        except gcp_exceptions.GoogleAPIError as e:
+            logger.error("Google API Error: %s", e)
+        return None
+
+    def delete_file(self, file_name, config) -> bool:
+        """
+        Deletes an object of the export partition.
+
+        Parameters:
+            file_name (str): Name of the object inside the partition.
+            config (dict): Configuration dictionary containing necessary information for storage.
+
+        Returns:
+            bool: True if the object was deleted.
+        """
+        try:
+            self._get_blob(file_name, config).delete()
+            return True
+        except gcp_exceptions.GoogleAPIError as e:
+            logger.error("Google API Error: %s", e)
+        return False
@@ -0,0 +1,48 @@
+""" Test cases for the Azure storage backend."""
+import unittest
+from unittest.mock import MagicMock, patch
+from azure.core.exceptions import ResourceExistsError
+from manifest import new_manifest, read_manifest, write_manifest
+from storage.azure_storage import AzureStorage
+
+CONFIG = {'file_key_prefix': 'opencost/', 'window_start': '2024-01-15T00:00:00Z'}
+
+
+class FakeContainer:  # pylint: disable=R0903
+    """In-memory container that rejects overwrites like Azure, unless requested."""
+
+    def __init__(self):
+        self.blobs = {}
+
+    def get_blob_client(self, key):
+        """Returns a client of one blob."""
+        blob_client = MagicMock(url=f"https://account/container/{key}")
+
+        def upload_blob(data, overwrite=False, **_):
+            if key in self.blobs and not overwrite:
+                raise ResourceExistsError("The specified blob already exists.")
+            self.blobs[key] = data if isinstance(data, bytes) else data.read()
+            return {'etag': 'etag'}
+        blob_client.upload_blob.side_effect = upload_blob
+        blob_client.download_blob.side_effect = lambda: MagicMock(
+            readall=lambda: self.blobs[key])
+        return blob_client
+
+
+class TestAzureStorage(unittest.TestCase):
+    """Test cases for AzureStorage"""
+
+    def test_rewrite_manifest(self):
+        """Test the manifest of a partition can be written again."""
+        storage = AzureStorage()
+        container = FakeContainer()
+        with patch.object(AzureStorage, '_get_container_client', return_value=container):
+            self.assertIsNotNone(write_manifest(new_manifest(), storage, CONFIG))
+            manifest = dict(new_manifest(), files=[{'name': 'part-1.parquet'}])
+            self.assertIsNotNone(write_manifest(manifest, storage, CONFIG))
+            self.assertEqual(read_manifest(storage, CONFIG, ['_manifest.json']), manifest)
+        self.assertEqual(list(container.blobs), ['opencost/2024/1/15/_manifest.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+""" Test cases for the compaction job."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from compaction import compact_partition, get_compaction_config, iter_row_groups, write_files
+from manifest import MANIFEST_FILE_NAME, live_files, new_manifest, write_manifest
+from storage.aws_s3_storage import S3Storage
+
+
+class TestCompaction(unittest.TestCase):
+    """Test cases for compact_partition method"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.storage = S3Storage()
+        self.config = get_compaction_config(
+            target_size=1024 * 1024, sort_by='properties.namespace,missing',
+            window_start='2024-01-15T00:00:00Z', window_end='2024-01-15T23:59:59Z',
+            file_key_prefix=self.test_dir, index='true')
+        self.partition = os.path.join(self.test_dir, 'year=2024/month=1/day=15')
+        for hour, namespace in enumerate(['ns3', 'ns1', 'ns2']):
+            data = pd.DataFrame({
+                'properties.namespace': [namespace, namespace],
+                'totalCost': [float(hour), float(hour) + 0.5]},
+                index=[hour, hour])
+            self.storage.save_data(data, dict(self.config, s3_bucket=None))
+            os.rename(os.path.join(self.partition, 'k8s_opencost.parquet'),
+                      os.path.join(self.partition, f"hour={hour}.parquet"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_compact_partition(self):
+        """Test small files are merged into one sorted zstd file listed in the manifest."""
+        manifest = compact_partition(self.storage, self.config)
+        files = sorted(os.listdir(self.partition))
+        self.assertEqual(len(files), 2)
+        self.assertEqual(files[0], MANIFEST_FILE_NAME)
+        self.assertTrue(files[1].startswith('part-'))
+        with open(os.path.join(self.partition, MANIFEST_FILE_NAME), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), manifest)
+        self.assertEqual(manifest['replaced'], [])
+        self.assertEqual([entry['name'] for entry in manifest['files']], [files[1]])
+        self.assertEqual(manifest['files'][0]['rows'], 6)
+        self.assertEqual(manifest['files'][0]['distinct'],
+                         {'properties.namespace': ['ns1', 'ns2', 'ns3']})
+
+        parquet_file = pq.ParquetFile(os.path.join(self.partition, files[1]))
+        self.assertEqual(parquet_file.metadata.row_group(0).column(0).compression, 'ZSTD')
+        table = parquet_file.read()
+        self.assertEqual(table.column_names, ['properties.namespace', 'totalCost'])
+        self.assertEqual(table['properties.namespace'].to_pylist(),
+                         ['ns1', 'ns1', 'ns2', 'ns2', 'ns3', 'ns3'])
+
+    def test_compact_partition_foreign_part_file(self):
+        """Test part files not written by a compaction are kept as data."""
+        self.storage.save_data(pd.DataFrame({'properties.namespace': ['ns4'], 'totalCost': [9.0]}),
+                               dict(self.config, file_name='part-00000-spark.snappy.parquet'))
+        manifest = compact_partition(self.storage, self.config)
+        self.assertEqual(manifest['files'][0]['rows'], 7)
+
+    def test_compact_partition_unfinished(self):
+        """Test outputs of an unfinished compaction are deleted, and not compacted."""
+        self.storage.save_data(pd.DataFrame({'properties.namespace': ['ns4'], 'totalCost': [9.0]}),
+                               dict(self.config, file_name='part-1-00000.parquet'))
+        pending = ['part-1-00000.parquet', 'part-1-00001.parquet']
+        write_manifest(dict(new_manifest(), pending=pending), self.storage, self.config)
+        manifest = compact_partition(self.storage, self.config)
+        self.assertEqual(manifest['files'][0]['rows'], 6)
+        self.assertEqual(manifest['pending'], [])
+        self.assertNotIn('part-1-00000.parquet', os.listdir(self.partition))
+
+    def test_compact_partition_twice(self):
+        """Test a compacted partition is left untouched."""
+        manifest = compact_partition(self.storage, self.config)
+        self.assertEqual(compact_partition(self.storage, self.config), manifest)
+
+    def test_compact_partition_unreadable_manifest(self):
+        """Test the partition is left untouched when its manifest cannot be read."""
+        with open(os.path.join(self.partition, MANIFEST_FILE_NAME), 'w', encoding='utf-8') as f:
+            f.write('{')
+        files = sorted(os.listdir(self.partition))
+        self.assertIsNone(compact_partition(self.storage, self.config))
+        self.assertEqual(sorted(os.listdir(self.partition)), files)
+
+
+class TestWriteFiles(unittest.TestCase):
+    """Test cases for write_files method"""
+
+    def test_write_files_target_size(self):
+        """Test the data is split into several files when larger than the target size."""
+        table = pa.table({'name': [f"pod-{i}" for i in range(10000)],
+                          'totalCost': [float(i) for i in range(10000)]})
+        batches = [table.slice(offset, 1000) for offset in range(0, 10000, 1000)]
+        files = write_files(iter_row_groups(batches, 16 * 1024), table.schema, 16 * 1024)
+        self.assertGreater(len(files), 1)
+        tables = [pq.read_table(file) for file in files]
+        self.assertTrue(pa.concat_tables(tables).equals(table))
+        files = write_files(iter_row_groups(batches, 1024 * 1024), table.schema, 1024 * 1024)
+        self.assertEqual(len(files), 1)
+
+    def test_write_files_sorted_row_groups(self):
+        """Test the rows of every row group are sorted."""
+        table = pa.table({'name': [f"pod-{i % 7}" for i in range(1000)]})
+        files = write_files(iter_row_groups([table], 2 * 1024), table.schema, 1024 * 1024,
+                            [('name', 'ascending')])
+        parquet_file = pq.ParquetFile(files[0])
+        self.assertGreater(parquet_file.num_row_groups, 1)
+        for index in range(parquet_file.num_row_groups):
+            names = parquet_file.read_row_group(index)['name'].to_pylist()
+            self.assertEqual(names, sorted(names))
+
+
+class TestLiveFiles(unittest.TestCase):
+    """Test cases for live_files method"""
+
+    def test_live_files(self):
+        """Test replaced files and unfinished compaction outputs are not live."""
+        manifest = {'version': 1, 'files': [{'name': 'part-1-00000.parquet'}],
+                    'replaced': ['old.parquet'], 'pending': ['part-2-00000.parquet']}
+        file_names = ['_manifest.json', 'new.parquet', 'old.parquet', 'part-0.parquet',
+                      'part-1-00000.parquet', 'part-2-00000.parquet']
+        self.assertEqual(live_files(manifest, file_names),
+                         ['part-1-00000.parquet', 'new.parquet', 'part-0.parquet'])
+        self.assertEqual(live_files(None, file_names),
+                         ['new.parquet', 'old.parquet', 'part-0.parquet',
+                          'part-1-00000.parquet', 'part-2-00000.parquet'])
+
+
+if __name__ == '__main__':
+    unittest.main()
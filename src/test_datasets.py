@@ -0,0 +1,88 @@
+""" Test cases for the dataset definitions."""
+import unittest
+from datasets import extract_splits, get_dataset_config, get_dataset_prefix, get_window_file_name
+
+CONFIG = {
+    'base_url': 'http://testhost:9003',
+    'url': 'http://testhost:9003/allocation/compute',
+    'params': (('window', '2024-01-01T00:00:00Z,2024-01-01T23:59:59Z'), ('step', '1h')),
+    'window': '2024-01-01T00:00:00Z,2024-01-01T23:59:59Z',
+    'file_key_prefix': '/tmp/cluster=test/',
+    'storage_backend': 'aws',
+    's3_bucket': 'opencost-export',
+    'schema_file': '/schemas/schema.json',
+}
+
+
+class TestGetDatasetConfig(unittest.TestCase):
+    """Test cases for get_dataset_config method"""
+
+    def test_allocation(self):
+        """Test the allocation dataset keeps the export configuration."""
+        config = get_dataset_config(CONFIG, 'allocation')
+        self.assertEqual(config['url'], CONFIG['url'])
+        self.assertEqual(config['params'], CONFIG['params'])
+        self.assertEqual(config['file_key_prefix'], CONFIG['file_key_prefix'])
+        self.assertEqual(config['schema_file'], CONFIG['schema_file'])
+        self.assertEqual(config['file_name'], 'k8s_opencost.parquet')
+
+    def test_assets(self):
+        """Test other datasets use their endpoint, window and their own location."""
+        config = get_dataset_config(CONFIG, 'assets')
+        self.assertEqual(config['dataset'], 'assets')
+        self.assertEqual(config['url'], 'http://testhost:9003/assets')
+        self.assertEqual(config['params'], (('window', CONFIG['window']),))
+        self.assertEqual(config['file_key_prefix'], '/tmp/cluster=test_assets/')
+        self.assertEqual(config['schema_file'], '/schemas/schema_assets.json')
+        self.assertEqual(config['file_name'], 'k8s_opencost_assets.parquet')
+        self.assertEqual(CONFIG['file_key_prefix'], '/tmp/cluster=test/')
+
+    def test_dataset_prefix(self):
+        """Test the dataset prefix is a sibling that keeps the trailing separator."""
+        self.assertEqual(get_dataset_prefix('opencost/', 'assets'), 'opencost_assets/')
+        self.assertEqual(get_dataset_prefix('opencost', 'cloudcost'), 'opencost_cloudcost')
+
+    def test_local_dataset_prefix(self):
+        """Test a local dataset is saved inside the allocation directory."""
+        self.assertEqual(get_dataset_prefix('/tmp/', 'assets', local=True), '/tmp/assets/')
+        config = get_dataset_config(dict(CONFIG, s3_bucket=None), 'assets')
+        self.assertEqual(config['file_key_prefix'], '/tmp/cluster=test/assets/')
+
+    def test_window_file_name(self):
+        """Test exports of a whole day keep the file name, shorter windows are named."""
+        self.assertEqual(get_window_file_name('k8s_opencost.parquet', CONFIG['window']),
+                         'k8s_opencost.parquet')
+        self.assertEqual(
+            get_window_file_name('k8s_opencost.parquet',
+                                 '2024-01-01T01:00:00Z,2024-01-01T02:00:00Z'),
+            'k8s_opencost_20240101T010000_20240101T020000.parquet')
+
+    def test_unsupported_dataset(self):
+        """Test an unknown dataset raises a ValueError."""
+        with self.assertRaises(ValueError):
+            get_dataset_config(CONFIG, 'unknown')
+
+
+class TestExtractSplits(unittest.TestCase):
+    """Test cases for extract_splits method"""
+
+    def test_allocation(self):
+        """Test allocation splits are returned as is."""
+        data = [{'a': {'name': 'a'}}, None]
+        self.assertEqual(extract_splits('allocation', data), [{'a': {'name': 'a'}}, {}])
+
+    def test_assets(self):
+        """Test a single asset set becomes a single split."""
+        data = {'node/a': {'type': 'Node'}}
+        self.assertEqual(extract_splits('assets', data), [data])
+
+    def test_cloudcost(self):
+        """Test cloud costs are extracted from every cloud cost set."""
+        data = {'sets': [{'cloudCosts': {'a': {'listCost': {'cost': 1}}}, 'window': {}},
+                         {'cloudCosts': None}]}
+        self.assertEqual(extract_splits('cloudcost', data),
+                         [{'a': {'listCost': {'cost': 1}}}, {}])
+
+
+if __name__ == '__main__':
+    unittest.main()
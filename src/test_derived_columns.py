@@ -0,0 +1,64 @@
+""" Test cases for the derived columns."""
+import json
+import os
+import unittest
+import numpy as np
+import pandas as pd
+from datasets import DATASETS
+from derived_columns import add_derived_columns, select_derived_columns
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestAddDerivedColumns(unittest.TestCase):
+    """Test cases for add_derived_columns method"""
+
+    def test_add_derived_columns(self):
+        """Test expressions are evaluated in order, with divisions by zero as nulls."""
+        data = pd.DataFrame({
+            'totalCost': [2.0, 3.0], 'cpuCoreHours': [4.0, 0.0],
+            'properties.namespace': ['ns1', 'ns2']})
+        data = add_derived_columns(data, {
+            'totalCostPerCpuCoreHour': {
+                'expression': 'totalCost / cpuCoreHours', 'type': 'float'},
+            'doubleCost': {
+                'expression': 'totalCostPerCpuCoreHour * cpuCoreHours * 2', 'type': 'float32'},
+        })
+        self.assertEqual(data['totalCostPerCpuCoreHour'].iloc[0], 0.5)
+        self.assertTrue(np.isnan(data['totalCostPerCpuCoreHour'].iloc[1]))
+        self.assertEqual(data['doubleCost'].dtype, 'float32')
+        self.assertEqual(data['doubleCost'].iloc[0], 4.0)
+
+    def test_missing_column(self):
+        """Test an expression using a missing column is rejected."""
+        with self.assertRaises(ValueError):
+            add_derived_columns(pd.DataFrame({'totalCost': [1.0]}), {
+                'costPerGpu': {'expression': 'totalCost / gpus', 'type': 'float'}})
+
+    def test_select_derived_columns(self):
+        """Test derived columns are skipped when a column they use is missing."""
+        derived_cols = {
+            'costPerGpu': {'expression': 'totalCost / gpus', 'type': 'float'},
+            'costPerHour': {'expression': '`total.cost` / minutes * 60', 'type': 'float'},
+            'doubleCostPerHour': {'expression': 'costPerHour * 2', 'type': 'float'}}
+        self.assertEqual(
+            list(select_derived_columns(derived_cols, ['totalCost', 'total.cost', 'minutes'])),
+            ['costPerHour', 'doubleCostPerHour'])
+
+    def test_dataset_definitions(self):
+        """Test the derived columns of every dataset only use its typed columns."""
+        for definition in DATASETS.values():
+            with open(os.path.join(DIRECTORY, definition['data_types']), encoding='utf-8') as f:
+                data_types = json.load(f)
+            with open(os.path.join(DIRECTORY, definition['rename_cols']), encoding='utf-8') as f:
+                rename_cols = json.load(f)
+            with open(os.path.join(DIRECTORY, definition['derived_cols']), encoding='utf-8') as f:
+                derived_cols = json.load(f)
+            columns = set(data_types) | set(rename_cols.values())
+            data = pd.DataFrame({column: [1.0] for column in columns})
+            data = add_derived_columns(data, derived_cols)
+            self.assertEqual(list(data.columns[len(columns):]), list(derived_cols))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+""" Test cases for the memory budget."""
+import unittest
+from unittest.mock import patch
+import pyarrow as pa
+import pyarrow.parquet as pq
+from memory import MIN_ROW_GROUP_SIZE, BatchedParquetFile, MemoryBudget, parse_memory_limit
+
+
+class TestParseMemoryLimit(unittest.TestCase):
+    """Test cases for parse_memory_limit"""
+
+    def test_parse_memory_limit(self):
+        """Test limits are parsed from bytes and Kubernetes quantities."""
+        self.assertIsNone(parse_memory_limit(None))
+        self.assertEqual(parse_memory_limit('1048576'), 1024 * 1024)
+        self.assertEqual(parse_memory_limit('512Mi'), 512 * 1024 * 1024)
+        self.assertEqual(parse_memory_limit('1.5G'), 1500 * 1000 * 1000)
+        with self.assertRaises(ValueError):
+            parse_memory_limit('lots')
+
+
+class TestMemoryBudget(unittest.TestCase):
+    """Test cases for MemoryBudget"""
+
+    def test_rss(self):
+        """Test the RSS of the process is measured."""
+        self.assertGreater(MemoryBudget(1).rss(), 0)
+
+    def test_pressure_and_row_group_size(self):
+        """Test row groups shrink with the memory left."""
+        budget = MemoryBudget(1000 * 1000)
+        with patch.object(MemoryBudget, 'rss', return_value=100 * 1000):
+            self.assertFalse(budget.under_pressure())
+            self.assertEqual(budget.row_group_size(100), 2250)
+        with patch.object(MemoryBudget, 'rss', return_value=900 * 1000):
+            self.assertTrue(budget.under_pressure())
+            self.assertEqual(budget.row_group_size(100), MIN_ROW_GROUP_SIZE)
+
+
+class TestBatchedParquetFile(unittest.TestCase):
+    """Test cases for BatchedParquetFile"""
+
+    def test_write_batches(self):
+        """Test batches are written in row groups that follow the budget, with the schema
+        of the first batch."""
+        first = pa.table({'totalCost': [float(i) for i in range(3000)],
+                          'label.team': pa.array(['core'] * 3000, pa.string())})
+        second = pa.table({'label.team': pa.nulls(2000), 'totalCost': [1.0] * 2000})
+        parquet_file = BatchedParquetFile(MemoryBudget(1))
+        with patch.object(MemoryBudget, 'row_group_size', return_value=2000):
+            parquet_file.write(first)
+            parquet_file.write(second)
+        parquet_file.close()
+        row_groups = list(parquet_file.iter_row_groups())
+        self.assertEqual([len(row_group) for row_group in row_groups], [2000, 1000, 2000])
+        table = pq.read_table(parquet_file.file)
+        self.assertEqual(table.schema, first.schema)
+        self.assertEqual(table.num_rows, 5000)
+        self.assertEqual(table['label.team'].null_count, 2000)
+
+    def test_empty_file(self):
+        """Test a file without batches is a valid, empty parquet file."""
+        parquet_file = BatchedParquetFile(MemoryBudget(1))
+        parquet_file.close()
+        self.assertEqual(pq.read_table(parquet_file.file).num_rows, 0)
+
+if __name__ == '__main__':
+    unittest.main()
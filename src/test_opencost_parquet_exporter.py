@@ -1,11 +1,70 @@
 """ Test cases for opencost-parquet-exporter."""
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
+from concurrent.futures.process import BrokenProcessPool
+import copy
+import gzip
 import json
+import multiprocessing
 import os
+import shutil
+import tempfile
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import requests
 from freezegun import freeze_time
-from opencost_parquet_exporter import get_config, request_data, load_config_file
+from opencost_parquet_exporter import get_config, request_data, load_config_file, process_result
+from opencost_parquet_exporter import ExportError, export_datasets, get_flatten_plan
+from opencost_parquet_exporter import remove_ignored_data
+from opencost_parquet_exporter import load_dataset_files, process_dataset
+from compaction import compact_partition, get_compaction_config
+from datasets import get_dataset_config
+from manifest import live_files, read_manifest
+from memory import MemoryBudget
+from profiler import Profiler
+from query_index import file_entry
+from schema import FlattenPlan, discover_schema
+from storage.aws_s3_storage import S3Storage
+from transfer import RawPayload
+
+
+def sample_allocation(name, namespace, labels, total_cost, minutes=60.0):
+    """Build an allocation as returned by the OpenCost allocation API."""
+    return {
+        'name': name,
+        'properties': {
+            'cluster': 'cluster-one',
+            'namespace': namespace,
+            'pod': name.split('/')[1],
+            'labels': labels,
+        },
+        'window': {'start': '2024-01-01T00:00:00Z', 'end': '2024-01-01T01:00:00Z'},
+        'start': '2024-01-01T00:00:00Z',
+        'end': '2024-01-01T01:00:00Z',
+        'minutes': minutes,
+        'cpuCoreHours': 1,
+        'cpuCost': 0.5,
+        'pvs': {'pv-1': {'cost': 1.0}},
+        'totalCost': total_cost,
+    }
+
+
+SAMPLE_RESULT = [
+    {
+        'ns1/pod-a/c1': sample_allocation('ns1/pod-a/c1', 'ns1', {'team': 'core'}, 1.5),
+        'ns2/pod-b/c1': sample_allocation('ns2/pod-b/c1', 'ns2', {}, 2),
+        '__unmounted__/__unmounted__/__unmounted__': sample_allocation(
+            '__unmounted__/__unmounted__/__unmounted__', '__unmounted__', {}, 3.0),
+    },
+    {
+        'ns1/pod-a/c1': sample_allocation(
+            'ns1/pod-a/c1', 'ns1', {'team': 'core', 'product': 'shop'}, 1.25, 30.0),
+    },
+]
+SAMPLE_DATA_TYPES = {'cpuCoreHours': 'float', 'totalCost': 'float', 'running_minutes': 'float'}
+SAMPLE_RENAME_COLS = {'minutes': 'running_minutes', 'properties.labels.team': 'label.team'}
 
 
 class TestGetConfig(unittest.TestCase):
@@ -114,6 +173,11 @@ class TestGetConfig(unittest.TestCase):
             self.assertTrue(config['file_key_prefix'], '/tmp/')
             self.assertNotIn('s3_bucket', config)
             self.assertEqual(config['params'][0][1], window)
+            self.assertFalse(config['profile'])
+            self.assertEqual(config['workers'], 1)
+            self.assertEqual(config['datasets'], ['allocation'])
+            self.assertIn('gzip', config['accept_encoding'])
+            self.assertFalse(config['record_raw'])
 
     @freeze_time("2024-02-01")
     def test_get_config_defaults_first_day_of_month(self):
@@ -170,6 +234,20 @@ class TestGetConfig(unittest.TestCase):
             self.assertEqual(config['params'][0][1], window)
 
 
+    def test_get_config_profile_enabled(self):
+        """Test get_config enables profiling through the environment variable."""
+        with patch.dict(os.environ, {'OPENCOST_PARQUET_PROFILE': 'True'}, clear=True):
+            config = get_config()
+            self.assertTrue(config['profile'])
+
+    def test_get_config_invalid_datasets(self):
+        """Test get_config rejects an empty or unsupported list of datasets."""
+        for datasets in ['', ' , ', 'allocation,nodes']:
+            with patch.dict(os.environ, {'OPENCOST_PARQUET_DATASETS': datasets}, clear=True):
+                with self.assertRaises(ValueError):
+                    get_config()
+
+
 class TestRequestData(unittest.TestCase):
     """ Test request_data method """
     @patch('opencost_parquet_exporter.requests.get')
@@ -222,6 +300,405 @@ class TestRequestData(unittest.TestCase):
         data = request_data(config)
         self.assertIsNone(data)
 
+    def test_request_data_with_session(self):
+        """Test request_data uses the given session."""
+        session = MagicMock()
+        session.get.return_value.headers = {'content-type': 'application/json'}
+        session.get.return_value.json.return_value = {'data': [{'key': 'value'}]}
+        config = {'url': 'http://testurl', 'params': (('sample_param', 'value'),)}
+        self.assertEqual(request_data(config, session=session), [{'key': 'value'}])
+        session.get.assert_called_once()
+
+    def test_request_data_compressed(self):
+        """Test request_data streams and decompresses a gzip response."""
+        body = gzip.compress(json.dumps({'data': [{'key': 'value'}]}).encode('utf-8'))
+        session = MagicMock()
+        response = session.get.return_value
+        response.headers = {'content-type': 'application/json', 'content-encoding': 'gzip'}
+        response.raw.stream.return_value = [body[:10], body[10:]]
+        config = {'url': 'http://testurl', 'params': (), 'accept_encoding': 'gzip'}
+        raw_payload = RawPayload()
+
+        data = request_data(config, session=session, raw_payload=raw_payload)
+
+        self.assertEqual(data, [{'key': 'value'}])
+        self.assertEqual(session.get.call_args.kwargs['headers'], {'Accept-Encoding': 'gzip'})
+        self.assertTrue(session.get.call_args.kwargs['stream'])
+        self.assertEqual(raw_payload.getvalue(), body)
+        self.assertEqual(raw_payload.file_name('_raw_allocation'), '_raw_allocation.json.gz')
+
+
+def mock_allocations(mock_session):
+    """Make the mocked session answer SAMPLE_RESULT to the allocation requests."""
+    def get(_url, **_):
+        response = MagicMock()
+        response.headers = {'content-type': 'application/json'}
+        response.raw.stream.return_value = [json.dumps({'data': SAMPLE_RESULT}).encode('utf-8')]
+        return response
+    mock_session.return_value.__enter__.return_value.get.side_effect = get
+
+
+class TestExportDatasets(unittest.TestCase):
+    """Test cases for export_datasets method"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    @patch('opencost_parquet_exporter.requests.Session')
+    def test_export_datasets(self, mock_session):
+        """Test every dataset is requested with the shared session and saved."""
+        responses = {
+            'http://localhost:9003/allocation/compute': copy.deepcopy(SAMPLE_RESULT),
+            'http://localhost:9003/assets': {
+                'node/a': {'type': 'Node', 'minutes': 60.0, 'totalCost': 2.0}},
+        }
+
+        def get(url, **_):
+            response = MagicMock()
+            response.headers = {'content-type': 'application/json', 'content-encoding': 'gzip'}
+            response.raw.stream.return_value = [
+                gzip.compress(json.dumps({'data': responses[url]}).encode('utf-8'))]
+            return response
+        session = mock_session.return_value.__enter__.return_value
+        session.get.side_effect = get
+
+        with patch.dict(os.environ, {}, clear=True):
+            config = get_config(
+                window_start='2024-01-01T00:00:00Z', window_end='2024-01-01T23:59:59Z',
+                file_key_prefix=f"{self.test_dir}/opencost", datasets='allocation,assets')
+        export_datasets(config, S3Storage(), Profiler())
+
+        self.assertEqual(session.get.call_count, 2)
+        allocations = pd.read_parquet(
+            f"{self.test_dir}/opencost/year=2024/month=1/day=1/k8s_opencost.parquet")
+        self.assertEqual(len(allocations), 3)
+        assets = pd.read_parquet(
+            f"{self.test_dir}/opencost/assets/year=2024/month=1/day=1/k8s_opencost_assets.parquet")
+        self.assertEqual(list(assets['running_minutes']), [60.0])
+        self.assertTrue(assets['ramCost'].isna().all())
+
+    @patch('opencost_parquet_exporter.requests.Session')
+    def test_export_datasets_workers(self, mock_session):
+        """Test the workers are forked before the requests and uploads start threads."""
+        mock_allocations(mock_session)
+        with patch.dict(os.environ, {}, clear=True):
+            config = get_config(file_key_prefix=f"{self.test_dir}/opencost", workers=2,
+                                datasets='allocation')
+        with patch('engines.base_engine.multiprocessing.get_context',
+                   wraps=multiprocessing.get_context) as get_context:
+            export_datasets(config, S3Storage(), Profiler())
+        get_context.assert_called_once_with('fork')
+        self.assertEqual(len(pd.read_parquet(f"{self.test_dir}/opencost")), 3)
+
+    @patch('opencost_parquet_exporter.requests.Session')
+    def test_export_compact_export_again(self, mock_session):
+        """Test exporting a day again after a compaction of its windows replaces them."""
+        mock_allocations(mock_session)
+        storage = S3Storage()
+        partition = f"{self.test_dir}/opencost/year=2024/month=1/day=1"
+
+        def export(window_start, window_end):
+            with patch.dict(os.environ, {}, clear=True):
+                config = get_compaction_config(
+                    window_start=window_start, window_end=window_end, index='true',
+                    file_key_prefix=f"{self.test_dir}/opencost", datasets='allocation')
+            export_datasets(config, storage, Profiler())
+            return get_dataset_config(config, 'allocation')
+
+        def live_rows(config):
+            manifest = read_manifest(storage, config)
+            return sum(len(pd.read_parquet(f"{partition}/{name}"))
+                       for name in live_files(manifest, storage.list_files(config)))
+
+        export('2024-01-01T00:00:00Z', '2024-01-01T01:00:00Z')
+        config = export('2024-01-01T01:00:00Z', '2024-01-01T02:00:00Z')
+        self.assertEqual(len(os.listdir(partition)), 3)
+        compact_partition(storage, config)
+        self.assertEqual(live_rows(config), 6)
+        config = export('2024-01-01T00:00:00Z', '2024-01-01T23:59:59Z')
+        self.assertEqual(live_rows(config), 3)
+        self.assertEqual(sorted(os.listdir(partition)), ['_manifest.json', 'k8s_opencost.parquet'])
+
+    @patch('opencost_parquet_exporter.requests.Session')
+    def test_export_datasets_fails_fast(self, mock_session):
+        """Test a failed dataset stops the export, and running requests end within the
+        read timeout."""
+        timeouts = []
+        started = threading.Event()
+
+        def get(url, timeout, **_):
+            if url.endswith('/assets'):
+                # A request that does not answer before the read timeout.
+                timeouts.append(timeout)
+                started.set()
+                threading.Event().wait(timeout[1])
+                raise requests.exceptions.ReadTimeout(url)
+            started.wait(10)
+            raise requests.exceptions.ConnectionError(url)
+        session = mock_session.return_value.__enter__.return_value
+        session.get.side_effect = get
+
+        with patch.dict(os.environ, {}, clear=True):
+            config = get_config(file_key_prefix=f"{self.test_dir}/opencost",
+                                datasets='allocation,assets', read_timeout=0.1)
+        with self.assertRaisesRegex(ExportError, 'allocation'):
+            export_datasets(config, S3Storage(), Profiler())
+        self.assertEqual(timeouts, [(15, 0.1)])
+
+
+class TestProcessResult(unittest.TestCase):
+    """Test cases for process_result method"""
+
+    def run_engine(self, engine, workers=1):
+        """Process a copy of the sample result with the given engine."""
+        return process_result(
+            copy.deepcopy(SAMPLE_RESULT),
+            ignored_alloc_keys=['pvs'],
+            rename_cols=SAMPLE_RENAME_COLS,
+            data_types=SAMPLE_DATA_TYPES,
+            engine=engine,
+            workers=workers)
+
+    def test_pandas_engine(self):
+        """Test the default engine renames, types and filters the allocations."""
+        data = self.run_engine('pandas')
+        self.assertEqual(len(data), 3)
+        self.assertNotIn('pvs.pv-1.cost', data.columns)
+        self.assertEqual(data['running_minutes'].dtype, 'float64')
+        self.assertEqual(list(data['label.team'].isna()), [False, True, False])
+
+    def test_arrow_engine_matches_pandas_engine(self):
+        """Test the arrow engine writes the same parquet schema and data as the pandas engine."""
+        expected = self.run_engine('pandas')
+        actual = self.run_engine('arrow')
+        self.assertEqual(sorted(actual.columns), sorted(expected.columns))
+        expected_table = pa.Table.from_pandas(expected, preserve_index=False)
+        actual_table = pa.Table.from_pandas(actual[expected.columns], preserve_index=False)
+        self.assertEqual(actual_table.schema, expected_table.schema)
+        self.assertTrue(actual_table.equals(expected_table))
+
+    def test_arrow_engine_fields_missing_from_first_allocation(self):
+        """Test the arrow engine keeps fields the first allocation of a split lacks."""
+        result = copy.deepcopy(SAMPLE_RESULT)
+        for allocation in list(result[0].values())[1:]:
+            allocation['gpuCost'] = 1.0
+        expected = process_result(
+            copy.deepcopy(result), ignored_alloc_keys=['pvs'], rename_cols=SAMPLE_RENAME_COLS,
+            data_types=SAMPLE_DATA_TYPES, engine='pandas')
+        actual = process_result(
+            result, ignored_alloc_keys=['pvs'], rename_cols=SAMPLE_RENAME_COLS,
+            data_types=SAMPLE_DATA_TYPES, engine='arrow')
+        self.assertEqual(sorted(actual.columns), sorted(expected.columns))
+        self.assertEqual(list(actual['gpuCost'].isna()), list(expected['gpuCost'].isna()))
+
+    def test_parallel_normalization_matches_serial(self):
+        """Test normalizing the splits in worker processes gives the serial result."""
+        for engine in ['pandas', 'arrow']:
+            expected = self.run_engine(engine).reset_index(drop=True)
+            actual = self.run_engine(engine, workers=2).reset_index(drop=True)
+            self.assertTrue(actual.equals(expected))
+
+    def test_parallel_normalization_with_threads(self):
+        """Test splits are normalized by fork server workers while other threads run."""
+        released = threading.Event()
+        thread = threading.Thread(target=released.wait)
+        thread.start()
+        try:
+            with patch('engines.base_engine.multiprocessing.get_context',
+                       wraps=multiprocessing.get_context) as get_context:
+                actual = self.run_engine('pandas', workers=2).reset_index(drop=True)
+        finally:
+            released.set()
+            thread.join()
+        get_context.assert_called_once_with('forkserver')
+        self.assertTrue(actual.equals(self.run_engine('pandas').reset_index(drop=True)))
+
+    def test_broken_process_pool(self):
+        """Test a worker process that dies makes processing fail instead of raising."""
+        with patch('engines.pandas_engine.PandasEngine.normalize_parallel',
+                   side_effect=BrokenProcessPool('worker died')):
+            self.assertIsNone(self.run_engine('pandas', workers=2))
+
+    def test_missing_data_type_column(self):
+        """Test typed columns missing from the data are filled with typed nulls."""
+        for engine in ['pandas', 'arrow']:
+            result = process_result(
+                copy.deepcopy(SAMPLE_RESULT), ignored_alloc_keys=[], rename_cols={},
+                data_types={'unknownColumn': 'float'}, engine=engine)
+            self.assertEqual(result['unknownColumn'].dtype, 'float64')
+            self.assertTrue(result['unknownColumn'].isna().all())
+
+    def test_flatten_plan_matches_engine(self):
+        """Test processing with the flatten plan of a discovered schema gives the same
+        columns and data types as processing without an output schema."""
+        result = copy.deepcopy(SAMPLE_RESULT)
+        remove_ignored_data(result, ['pvs'])
+        schema = discover_schema(result, SAMPLE_RENAME_COLS, SAMPLE_DATA_TYPES)
+        for engine in ['pandas', 'arrow']:
+            expected = self.run_engine(engine)
+            actual = process_result(
+                copy.deepcopy(SAMPLE_RESULT), ignored_alloc_keys=['pvs'], rename_cols={},
+                data_types={}, engine=engine, flatten_plan=FlattenPlan(schema))
+            self.assertEqual(sorted(actual.columns), sorted(expected.columns))
+            expected_table = pa.Table.from_pandas(expected, preserve_index=False)
+            actual_table = pa.Table.from_pandas(actual[expected.columns], preserve_index=False)
+            self.assertTrue(actual_table.equals(expected_table))
+
+    def test_flatten_plan_missing_string_column(self):
+        """Test a string column missing from a day's data is still written as string."""
+        result = copy.deepcopy(SAMPLE_RESULT)
+        remove_ignored_data(result, ['pvs'])
+        schema = discover_schema(result, SAMPLE_RENAME_COLS, SAMPLE_DATA_TYPES)
+        day_two = copy.deepcopy(SAMPLE_RESULT)
+        for split in day_two:
+            for allocation in split.values():
+                allocation['properties']['labels'] = {}
+        for engine in ['pandas', 'arrow']:
+            data = process_result(
+                copy.deepcopy(day_two), ignored_alloc_keys=['pvs'], rename_cols={},
+                data_types={}, engine=engine, flatten_plan=FlattenPlan(schema))
+            table = pa.Table.from_pandas(data, preserve_index=False)
+            self.assertEqual(table.schema.field('label.team').type, pa.string())
+            self.assertEqual(table.schema.field('properties.labels.product').type, pa.string())
+
+    def test_flatten_plan_schema_drift(self):
+        """Test fields missing from the data are typed nulls and new fields are dropped."""
+        schema = {'version': 2, 'columns': [
+            {'name': 'name', 'path': ['name'], 'type': None},
+            {'name': 'label.team', 'path': ['properties', 'labels', 'team'], 'type': None},
+            {'name': 'gpuCost', 'path': ['gpuCost'], 'type': 'float'},
+        ]}
+        for engine in ['pandas', 'arrow']:
+            data = process_result(
+                copy.deepcopy(SAMPLE_RESULT), ignored_alloc_keys=[], rename_cols={},
+                data_types={}, engine=engine, flatten_plan=FlattenPlan(schema))
+            self.assertEqual(list(data.columns), ['name', 'label.team', 'gpuCost'])
+            self.assertEqual(data['gpuCost'].dtype, 'float64')
+            self.assertTrue(data['gpuCost'].isna().all())
+
+    def test_derived_columns(self):
+        """Test derived columns are computed from the typed, renamed columns."""
+        data = process_result(
+            copy.deepcopy(SAMPLE_RESULT), ignored_alloc_keys=['pvs'],
+            rename_cols=SAMPLE_RENAME_COLS, data_types=SAMPLE_DATA_TYPES,
+            derived_cols={'totalCostPerHour': {
+                'expression': 'totalCost / running_minutes * 60', 'type': 'float'}})
+        self.assertEqual(list(data['totalCostPerHour']), [1.5, 2.0, 2.5])
+
+    def test_memory_budget(self):
+        """Test batches processed under memory pressure match the unbudgeted data."""
+        result = copy.deepcopy(SAMPLE_RESULT)
+        with patch.object(MemoryBudget, 'under_pressure', return_value=True):
+            parquet_file = process_result(
+                result, ignored_alloc_keys=['pvs'], rename_cols=SAMPLE_RENAME_COLS,
+                data_types=SAMPLE_DATA_TYPES, memory_budget=MemoryBudget(1))
+        self.assertEqual(result, [None] * len(SAMPLE_RESULT))
+        table = pq.read_table(parquet_file.file)
+        expected_data = self.run_engine('pandas')
+        expected = pa.Table.from_pandas(expected_data, preserve_index=False)
+        columns = sorted(expected.column_names)
+        self.assertTrue(table.select(columns).equals(expected.select(columns)))
+        config = {'index_distinct': ['label.team', 'properties.labels.product'],
+                  'index_bloom': ['properties.pod']}
+        self.assertEqual(file_entry('k8s_opencost.parquet', parquet_file, config),
+                         file_entry('k8s_opencost.parquet', expected_data, config))
+
+    def test_memory_budget_list_in_later_batch(self):
+        """Test a list column that is null in the first batch keeps its list type."""
+        for engine in ['pandas', 'arrow']:
+            result = copy.deepcopy(SAMPLE_RESULT)
+            result[1]['ns1/pod-a/c1']['properties']['services'] = ['svc-a', 'svc-b']
+            with patch.object(MemoryBudget, 'under_pressure', return_value=True):
+                parquet_file = process_result(
+                    result, ignored_alloc_keys=['pvs'], rename_cols=SAMPLE_RENAME_COLS,
+                    data_types=SAMPLE_DATA_TYPES, engine=engine, memory_budget=MemoryBudget(1))
+            services = pq.read_table(parquet_file.file)['properties.services']
+            self.assertEqual(services.type, pa.list_(pa.string()))
+            self.assertEqual(services.to_pylist(), [None, None, ['svc-a', 'svc-b']])
+
+    def test_index_default_columns(self):
+        """Test the default index columns exist in data processed with the real flatten
+        rules, so their distinct values and bloom filters are built."""
+        config = get_config()
+        data_types, rename_cols, ignore_keys, _ = load_dataset_files('allocation')
+        data = process_result(copy.deepcopy(SAMPLE_RESULT), ignored_alloc_keys=ignore_keys,
+                              rename_cols=rename_cols, data_types=data_types)
+        entry = file_entry('k8s_opencost.parquet', data, config)
+        self.assertEqual(sorted(entry['distinct']), sorted(config['index_distinct']))
+        self.assertEqual(sorted(entry['bloom']), sorted(config['index_bloom']))
+        self.assertEqual(entry['distinct']['label.team'], ['core'])
+
+    def test_unsupported_engine(self):
+        """Test processing fails with an unknown engine name."""
+        self.assertIsNone(self.run_engine('spark'))
+
+
+class TestGetFlattenPlan(unittest.TestCase):
+    """Test cases for get_flatten_plan method"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.storage = S3Storage()
+        self.config = {'file_key_prefix': f"{self.test_dir}/opencost/",
+                       'window_start': '2024-01-15T00:00:00Z',
+                       'schema_file': f"{self.test_dir}/config/schema.json",
+                       'schema_drift': 'report'}
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def get_plan(self, result, config):
+        """Compile the flatten plan of a result with the sample flatten rules."""
+        return get_flatten_plan(config, copy.deepcopy(result), ['pvs'],
+                                SAMPLE_RENAME_COLS, SAMPLE_DATA_TYPES, self.storage)
+
+    def test_schema_saved_through_storage(self):
+        """Test the discovered schema is saved at the root of the export prefix and reused
+        by later runs, even when they see other fields."""
+        first = self.get_plan(SAMPLE_RESULT[:1], self.config)
+        self.assertTrue(os.path.exists(f"{self.test_dir}/opencost/schema.json"))
+        self.assertFalse(os.path.exists(self.config['schema_file']))
+        second = self.get_plan(SAMPLE_RESULT, self.config)
+        self.assertEqual(second.version, 1)
+        self.assertEqual(second.columns, first.columns)
+        self.assertNotIn('properties.labels.product', second.columns)
+
+    def test_schema_evolve(self):
+        """Test the evolve drift mode saves new fields as a new schema version."""
+        self.get_plan(SAMPLE_RESULT[:1], self.config)
+        plan = self.get_plan(SAMPLE_RESULT, dict(self.config, schema_drift='evolve'))
+        self.assertEqual(plan.version, 2)
+        self.assertEqual(plan.columns[-1], 'properties.labels.product')
+        self.assertEqual(self.get_plan(SAMPLE_RESULT, self.config).version, 2)
+
+    def test_provided_schema(self):
+        """Test a schema provided as a file is used as is and never saved or evolved."""
+        os.makedirs(os.path.dirname(self.config['schema_file']))
+        with open(self.config['schema_file'], 'w', encoding='utf-8') as file:
+            json.dump({'version': 4, 'columns': [
+                {'name': 'name', 'path': ['name'], 'type': 'string'}]}, file)
+        plan = self.get_plan(SAMPLE_RESULT, dict(self.config, schema_drift='evolve'))
+        self.assertEqual((plan.version, plan.columns), (4, ['name']))
+        self.assertFalse(os.path.exists(f"{self.test_dir}/opencost/schema.json"))
+
+    def test_provided_schema_derived_columns(self):
+        """Test derived columns using columns missing from a provided schema are skipped."""
+        os.makedirs(os.path.dirname(self.config['schema_file']))
+        with open(self.config['schema_file'], 'w', encoding='utf-8') as file:
+            json.dump({'version': 1, 'columns': [
+                {'name': 'totalCost', 'path': ['totalCost'], 'type': 'float'},
+                {'name': 'running_minutes', 'path': ['minutes'], 'type': 'float'}]}, file)
+        with patch.dict(os.environ, {}, clear=True):
+            config = get_dataset_config(get_config(
+                file_key_prefix=self.config['file_key_prefix'],
+                schema_file=self.config['schema_file']), 'allocation')
+        data = process_dataset(config, copy.deepcopy(SAMPLE_RESULT), self.storage, Profiler())
+        self.assertEqual(list(data.columns), ['totalCost', 'running_minutes', 'totalCostPerHour'])
+        self.assertEqual(list(data['totalCostPerHour']), [1.5, 2.0, 2.5])
+
 
 class TestLoadConfigMaps(unittest.TestCase):
     """Test cases for load_config_file method"""
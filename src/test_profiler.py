@@ -0,0 +1,68 @@
+""" Test cases for the profiling hooks."""
+import unittest
+from unittest.mock import MagicMock
+import marshal
+import threading
+from profiler import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    """Test cases for Profiler"""
+
+    def test_disabled_profiler_records_nothing(self):
+        """Test stages are not profiled and nothing is saved when disabled."""
+        profiler = Profiler(enabled=False)
+        with profiler.stage('noop'):
+            sum(range(10))
+        storage = MagicMock()
+        self.assertEqual(profiler.stages, [])
+        self.assertEqual(profiler.save(storage, {}), [])
+        storage.save_file.assert_not_called()
+
+    def test_enabled_profiler_saves_artifacts(self):
+        """Test each stage is profiled and saved through the storage backend."""
+        profiler = Profiler(enabled=True, top_n=5)
+        with profiler.stage('build'):
+            data = [str(i) for i in range(1000)]
+        self.assertEqual(len(data), 1000)
+        self.assertEqual(profiler.stages[0]['name'], 'build')
+        self.assertGreater(profiler.stages[0]['peak_bytes'], 0)
+
+        storage = MagicMock()
+        storage.save_file.side_effect = lambda data, file_name, config: file_name
+        uris = profiler.save(storage, {})
+        self.assertEqual(uris, ['_profile_build.pstats', '_profile_summary.txt'])
+        pstats_bytes = storage.save_file.call_args_list[0][0][0]
+        self.assertIsInstance(marshal.loads(pstats_bytes), dict)
+        summary = storage.save_file.call_args_list[1][0][0].decode('utf-8')
+        self.assertIn('== Stage build', summary)
+
+    def test_stages_of_threads_are_serialized(self):
+        """Test a stage of another thread waits until the running stage ends."""
+        profiler = Profiler(enabled=True)
+        events = []
+
+        def other_stage():
+            with profiler.stage('other'):
+                events.append('other')
+        with profiler.stage('main'):
+            thread = threading.Thread(target=other_stage)
+            thread.start()
+            thread.join(0.2)
+            events.append('main')
+        thread.join()
+        self.assertEqual(events, ['main', 'other'])
+        self.assertEqual([stage['name'] for stage in profiler.stages], ['main', 'other'])
+
+    def test_nested_stage(self):
+        """Test a stage inside another one fails instead of stopping the outer profile."""
+        profiler = Profiler(enabled=True)
+        with profiler.stage('outer'):
+            with self.assertRaises(RuntimeError):
+                with profiler.stage('inner'):
+                    pass
+        self.assertEqual([stage['name'] for stage in profiler.stages], ['outer'])
+
+
+if __name__ == '__main__':
+    unittest.main()
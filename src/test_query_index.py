@@ -0,0 +1,138 @@
+""" Test cases for the query index."""
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import pyarrow as pa
+from manifest import (MANIFEST_FILE_NAME, ManifestError, new_manifest, read_manifest,
+                      write_manifest)
+from query_index import (BloomFilter, file_entry, file_matches, index_file, prune_files,
+                         replaced_files)
+from storage.aws_s3_storage import S3Storage
+
+CONFIG = {
+    'index_distinct': ['properties.namespace'],
+    'index_bloom': ['properties.pod'],
+}
+
+
+def sample_data(namespace, costs):
+    """Build exported allocations of one namespace."""
+    return pd.DataFrame({
+        'properties.namespace': [namespace] * len(costs),
+        'properties.pod': [f"{namespace}-pod-{i}" for i in range(len(costs))],
+        'window.start': ['2024-01-01T00:00:00Z'] * len(costs),
+        'totalCost': costs,
+        'labels': [{'team': 'a'}] * len(costs)})
+
+
+class TestBloomFilter(unittest.TestCase):
+    """Test cases for BloomFilter"""
+
+    def test_bloom_filter(self):
+        """Test added values are found, after a JSON round trip too."""
+        bloom_filter = BloomFilter.for_capacity(1000)
+        for i in range(1000):
+            bloom_filter.add(f"pod-{i}")
+        restored = BloomFilter.from_dict(bloom_filter.to_dict())
+        self.assertTrue(all(f"pod-{i}" in restored for i in range(1000)))
+        false_positives = sum(f"other-{i}" in restored for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+
+class TestFileEntry(unittest.TestCase):
+    """Test cases for file_entry and file_matches"""
+
+    def test_file_entry(self):
+        """Test the entry has the row count, min/max, distinct values and bloom filters."""
+        data = sample_data('ns1', [1.0, float('nan'), 3.0])
+        entry = file_entry('k8s_opencost.parquet', data, CONFIG)
+        self.assertEqual(entry, file_entry('k8s_opencost.parquet', pa.Table.from_pandas(
+            data, preserve_index=False), CONFIG))
+        self.assertEqual(entry['rows'], 3)
+        self.assertEqual(entry['columns']['totalCost'], {'min': 1.0, 'max': 3.0})
+        self.assertNotIn('labels', entry['columns'])
+        self.assertEqual(entry['distinct'], {'properties.namespace': ['ns1']})
+        self.assertEqual(list(entry['bloom']), ['properties.pod'])
+
+    def test_file_matches(self):
+        """Test files are pruned by distinct values, bloom filters and ranges."""
+        entry = file_entry('k8s_opencost.parquet', sample_data('ns1', [1.0, 3.0]), CONFIG)
+        self.assertTrue(file_matches(entry, equals={'properties.namespace': 'ns1'}))
+        self.assertFalse(file_matches(entry, equals={'properties.namespace': 'ns2'}))
+        self.assertTrue(file_matches(entry, equals={'properties.pod': 'ns1-pod-1'}))
+        self.assertFalse(file_matches(entry, equals={'properties.pod': 'ns2-pod-1'}))
+        self.assertTrue(file_matches(entry, ranges={'totalCost': (2.0, None)}))
+        self.assertFalse(file_matches(entry, ranges={'totalCost': (None, 0.5)}))
+        self.assertFalse(file_matches(entry, equals={'totalCost': 5.0}))
+        self.assertTrue(file_matches(entry, equals={'totalCost': 'not comparable'}))
+        self.assertTrue(file_matches(entry, equals={'properties.labels.team': 'a'}))
+
+
+class TestPruneFiles(unittest.TestCase):
+    """Test cases for index_file and prune_files"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.storage = S3Storage()
+        self.config = dict(CONFIG, file_key_prefix=self.test_dir)
+        for day, namespace in [('2024-01-01', 'ns1'), ('2024-01-02', 'ns2')]:
+            day_config = dict(self.config, window_start=f"{day}T00:00:00Z")
+            data = sample_data(namespace, [1.0, 2.0])
+            self.storage.save_data(data, day_config)
+            index_file(self.storage, day_config, data)
+        # A partition exported before the index existed.
+        self.storage.save_data(sample_data('ns1', [1.0]),
+                               dict(self.config, window_start='2024-01-03T00:00:00Z'))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_prune_files(self):
+        """Test only the files that may match are returned."""
+        files = prune_files(self.storage, self.config, '2024-01-01', '2024-01-03',
+                            equals={'properties.namespace': 'ns2'})
+        self.assertEqual(files, [('2024-01-02', 'k8s_opencost.parquet'),
+                                 ('2024-01-03', 'k8s_opencost.parquet')])
+
+    def test_index_file_again(self):
+        """Test a file written again replaces its entry and is live again."""
+        day_config = dict(self.config, window_start='2024-01-01T00:00:00Z')
+        manifest = read_manifest(self.storage, day_config)
+        manifest['replaced'] = ['k8s_opencost.parquet']
+        write_manifest(manifest, self.storage, day_config)
+
+        index_file(self.storage, day_config, sample_data('ns3', [4.0]))
+        manifest = read_manifest(self.storage, day_config)
+        self.assertEqual(manifest['replaced'], [])
+        self.assertEqual(len(manifest['files']), 1)
+        self.assertEqual(manifest['files'][0]['distinct'],
+                         {'properties.namespace': ['ns3']})
+
+    def test_replaced_files(self):
+        """Test files holding data of the window only are replaced, other windows conflict."""
+        hours = [f"2024-01-01T0{hour}:00:00Z,2024-01-01T0{hour + 1}:00:00Z" for hour in range(3)]
+        day_config = dict(self.config, window_start='2024-01-01T00:00:00Z',
+                          window='2024-01-01T00:00:00Z,2024-01-01T02:00:00Z')
+        manifest = new_manifest()
+        manifest['files'] = [{'name': 'a.parquet', 'windows': hours[:2]},
+                             {'name': 'b.parquet', 'windows': hours[2:]}]
+        write_manifest(manifest, self.storage, day_config)
+        self.assertEqual(replaced_files(self.storage, day_config), ['a.parquet'])
+
+        manifest['files'][1]['windows'] = hours[1:]
+        write_manifest(manifest, self.storage, day_config)
+        self.assertIsNone(replaced_files(self.storage, day_config))
+
+    def test_index_file_unreadable_manifest(self):
+        """Test a manifest that cannot be read is not overwritten."""
+        day_config = dict(self.config, window_start='2024-01-01T00:00:00Z')
+        self.storage.save_file(b'{', MANIFEST_FILE_NAME, day_config)
+        self.assertIsNone(index_file(self.storage, day_config, sample_data('ns3', [4.0])))
+        self.assertEqual(self.storage.read_file(MANIFEST_FILE_NAME, day_config), b'{')
+        with self.assertRaises(ManifestError):
+            read_manifest(self.storage, day_config)
+
+
+if __name__ == '__main__':
+    unittest.main()
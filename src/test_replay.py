@@ -0,0 +1,88 @@
+""" Test cases for the offline replay."""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from manifest import read_manifest, write_manifest
+from replay import get_replay_config, replay
+from storage.aws_s3_storage import S3Storage
+
+
+def raw_response(namespace):
+    """Build a gzip compressed allocation response, as saved by the export."""
+    allocation = {
+        'name': f"{namespace}/pod-a",
+        'properties': {'namespace': namespace, 'pod': 'pod-a'},
+        'window': {'start': '2024-01-01T00:00:00Z', 'end': '2024-01-02T00:00:00Z'},
+        'start': '2024-01-01T00:00:00Z', 'end': '2024-01-02T00:00:00Z', 'minutes': 1440.0,
+        'totalCost': 1.5,
+    }
+    data = {'code': 200, 'data': [{allocation['name']: allocation}]}
+    return gzip.compress(json.dumps(data).encode('utf-8'))
+
+
+class TestReplay(unittest.TestCase):
+    """Test cases for the replay"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with patch.dict(os.environ, {}, clear=True):
+            self.config = get_replay_config(
+                replay_start='2024-01-30', replay_end='2024-02-01', replay_workers=2,
+                file_key_prefix=self.test_dir)
+        storage = S3Storage()
+        for day in ['2024-01-30', '2024-01-31', '2024-02-01']:
+            storage.save_file(raw_response(f"ns-{day}"), '_raw_allocation.json.gz',
+                              dict(self.config, window_start=f"{day}T00:00:00Z"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_replay_days(self):
+        """Test the replay covers every day between start and end."""
+        self.assertEqual(self.config['replay_days'], ['2024-01-30', '2024-01-31', '2024-02-01'])
+
+    def test_replay(self):
+        """Test every day is processed from its raw response and saved in its partition."""
+        self.assertEqual(replay(self.config), [])
+        data = pd.read_parquet(
+            f"{self.test_dir}/year=2024/month=1/day=31/k8s_opencost.parquet")
+        self.assertEqual(list(data['properties.namespace']), ['ns-2024-01-31'])
+        self.assertEqual(list(data['running_minutes']), [1440.0])
+
+    def test_replay_compacted_day(self):
+        """Test the files of a compacted day are replaced by the replayed file."""
+        storage = S3Storage()
+        day_config = dict(self.config, window_start='2024-01-31T00:00:00Z')
+        compacted = pd.DataFrame({'properties.namespace': ['ns-2024-01-31'],
+                                  'totalCost': [1.5]})
+        storage.save_data(compacted, dict(day_config, file_name='part-run-00000.parquet'))
+        hour_file = 'k8s_opencost_20240131T230000_20240201T000000.parquet'
+        storage.save_data(compacted, dict(day_config, file_name=hour_file))
+        # Files written by other tools are not replaced.
+        storage.save_data(compacted, dict(day_config, file_name='part-00000-spark.parquet'))
+        write_manifest({'version': 1, 'files': [{'name': 'part-run-00000.parquet'}],
+                        'replaced': ['k8s_opencost.parquet'], 'pending': []},
+                       storage, day_config)
+        config = dict(self.config, replay_days=['2024-01-31'], replay_workers=1, index=True)
+        self.assertEqual(replay(config), [])
+        self.assertEqual(storage.list_files(day_config),
+                         ['_manifest.json', '_raw_allocation.json.gz', 'k8s_opencost.parquet',
+                          'part-00000-spark.parquet'])
+        manifest = read_manifest(storage, day_config)
+        self.assertEqual([entry['name'] for entry in manifest['files']],
+                         ['k8s_opencost.parquet'])
+        self.assertEqual((manifest['replaced'], manifest['pending']), ([], []))
+
+    def test_replay_missing_day(self):
+        """Test a day without raw response is reported as failed."""
+        config = dict(self.config, replay_days=['2024-01-31', '2024-02-02'], replay_workers=1)
+        self.assertEqual(replay(config), ['2024-02-02'])
+
+
+if __name__ == '__main__':
+    unittest.main()
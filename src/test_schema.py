@@ -0,0 +1,125 @@
+""" Test cases for the output schema and flatten plans."""
+import os
+import shutil
+import tempfile
+import unittest
+from schema import FlattenPlan, discover_schema, evolve_schema, read_schema, write_schema
+from storage.aws_s3_storage import S3Storage
+
+RESULT = [
+    {
+        'a': {'name': 'a', 'properties': {'namespace': 'ns1', 'labels': {'team': 'core'}},
+              'minutes': 60.0},
+        'b': {'name': 'b', 'properties': {'namespace': 'ns2', 'labels': {}}, 'minutes': 30.0},
+    },
+    {
+        'a': {'name': 'a', 'properties': {'namespace': 'ns1', 'labels': {'app': 'web'}},
+              'minutes': 15.0, 'gpuCost': 1.0},
+    },
+]
+
+
+class TestDiscoverSchema(unittest.TestCase):
+    """Test cases for discover_schema method"""
+
+    def test_discover_schema(self):
+        """Test every leaf becomes a renamed, typed column and typed columns are kept."""
+        schema = discover_schema(
+            RESULT, rename_cols={'minutes': 'running_minutes'},
+            data_types={'running_minutes': 'float', 'ramCost': 'float'}, version=3)
+        self.assertEqual(schema['version'], 3)
+        self.assertEqual(schema['columns'], [
+            {'name': 'name', 'path': ['name'], 'type': 'string'},
+            {'name': 'properties.namespace', 'path': ['properties', 'namespace'],
+             'type': 'string'},
+            {'name': 'properties.labels.team', 'path': ['properties', 'labels', 'team'],
+             'type': 'string'},
+            {'name': 'running_minutes', 'path': ['minutes'], 'type': 'float'},
+            {'name': 'properties.labels.app', 'path': ['properties', 'labels', 'app'],
+             'type': 'string'},
+            {'name': 'gpuCost', 'path': ['gpuCost'], 'type': 'float'},
+            {'name': 'ramCost', 'path': ['ramCost'], 'type': 'float'},
+        ])
+
+    def test_discover_schema_inferred_types(self):
+        """Test the type of a column is its first non-null value's, None for nulls only."""
+        result = [{'a': {'x': None, 'y': None, 'z': [1], 'flag': True}},
+                  {'a': {'x': 1, 'y': None}}]
+        schema = discover_schema(result, rename_cols={}, data_types={})
+        self.assertEqual([column['type'] for column in schema['columns']],
+                         ['float', None, None, 'boolean'])
+
+
+class TestEvolveSchema(unittest.TestCase):
+    """Test cases for evolve_schema method"""
+
+    def test_evolve_schema(self):
+        """Test new fields are appended as a new version, known columns are unchanged."""
+        schema = discover_schema(RESULT[:1], rename_cols={}, data_types={'name': 'string'})
+        evolved = evolve_schema(schema, RESULT, rename_cols={}, data_types={})
+        self.assertEqual(evolved['version'], 2)
+        self.assertEqual(evolved['columns'][:len(schema['columns'])], schema['columns'])
+        self.assertEqual(evolved['columns'][len(schema['columns']):], [
+            {'name': 'properties.labels.app', 'path': ['properties', 'labels', 'app'],
+             'type': 'string'},
+            {'name': 'gpuCost', 'path': ['gpuCost'], 'type': 'float'},
+        ])
+        self.assertIs(evolve_schema(evolved, RESULT, rename_cols={}, data_types={}), evolved)
+
+
+class TestStoredSchema(unittest.TestCase):
+    """Test cases for read_schema and write_schema methods"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.config = {'file_key_prefix': f"{self.test_dir}/opencost/",
+                       'window_start': '2024-01-15T00:00:00Z',
+                       'schema_file': '/missing/schema.json'}
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_write_and_read_schema(self):
+        """Test the schema is stored at the root of the export prefix, not in a partition."""
+        storage = S3Storage()
+        self.assertIsNone(read_schema(storage, self.config))
+        schema = discover_schema(RESULT, rename_cols={}, data_types={})
+        self.assertIsNotNone(write_schema(schema, storage, self.config))
+        self.assertTrue(os.path.exists(f"{self.test_dir}/opencost/schema.json"))
+        self.assertEqual(storage.list_files(self.config), [])
+        self.assertEqual(read_schema(storage, self.config), schema)
+
+
+class TestFlattenPlan(unittest.TestCase):
+    """Test cases for FlattenPlan"""
+
+    def setUp(self):
+        self.plan = FlattenPlan({'version': 1, 'columns': [
+            {'name': 'name', 'path': ['name'], 'type': None},
+            {'name': 'label.team', 'path': ['properties', 'labels', 'team'], 'type': None},
+            {'name': 'running_minutes', 'path': ['minutes'], 'type': 'float'},
+        ]})
+
+    def test_flatten(self):
+        """Test allocations are flattened into schema columns, missing fields are None."""
+        columns = self.plan.flatten(RESULT[0].values())
+        self.assertEqual(columns, {
+            'name': ['a', 'b'],
+            'label.team': ['core', None],
+            'running_minutes': [60.0, 30.0],
+        })
+        self.assertEqual(self.plan.data_types, {'running_minutes': 'float'})
+
+    def test_flatten_empty(self):
+        """Test an empty split gives empty columns."""
+        self.assertEqual(self.plan.flatten([]),
+                         {'name': [], 'label.team': [], 'running_minutes': []})
+
+    def test_new_fields(self):
+        """Test fields that are not in the schema are reported."""
+        self.assertCountEqual(self.plan.new_fields(RESULT), [
+            ('properties', 'namespace'), ('properties', 'labels', 'app'), ('gpuCost',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
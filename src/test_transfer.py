@@ -0,0 +1,56 @@
+""" Test cases for the compressed transfer helpers."""
+import gzip
+import unittest
+from unittest.mock import patch
+import zlib
+from transfer import decode_payload, get_accept_encoding, get_decompressor
+
+
+class TestAcceptEncoding(unittest.TestCase):
+    """Test cases for get_accept_encoding"""
+
+    def test_auto_without_zstandard(self):
+        """Test auto falls back to gzip when zstandard is not installed."""
+        with patch('transfer.zstandard', None):
+            self.assertEqual(get_accept_encoding('auto'), 'gzip')
+            with self.assertRaises(ValueError):
+                get_accept_encoding('zstd')
+
+    def test_none_and_unsupported(self):
+        """Test compression can be disabled, and unknown values are rejected."""
+        self.assertEqual(get_accept_encoding('none'), 'identity')
+        with self.assertRaises(ValueError):
+            get_accept_encoding('brotli')
+
+
+class TestDecompressor(unittest.TestCase):
+    """Test cases for get_decompressor"""
+
+    def decompress(self, content_encoding, data, chunk_size=7):
+        """Decompress data in chunks, as received from the network."""
+        decompressor = get_decompressor(content_encoding)
+        output = b''.join(decompressor.decompress(data[offset:offset + chunk_size])
+                          for offset in range(0, len(data), chunk_size))
+        return output + decompressor.flush()
+
+    def test_decompress_chunks(self):
+        """Test gzip, deflate and identity bodies are decompressed chunk by chunk."""
+        body = b'{"data": [' + b'{"a": 1},' * 100 + b'{}]}'
+        self.assertEqual(self.decompress('gzip', gzip.compress(body)), body)
+        self.assertEqual(self.decompress('deflate', zlib.compress(body)), body)
+        self.assertEqual(self.decompress('identity', body), body)
+
+    def test_decode_payload(self):
+        """Test saved payloads are decoded according to their extension."""
+        body = b'{"data": []}'
+        self.assertEqual(decode_payload(gzip.compress(body), '_raw_assets.json.gz'), {'data': []})
+        self.assertEqual(decode_payload(body, '_raw_assets.json'), {'data': []})
+
+    def test_unsupported_encoding(self):
+        """Test an unknown content encoding is rejected."""
+        with self.assertRaises(ValueError):
+            get_decompressor('br')
+
+
+if __name__ == '__main__':
+    unittest.main()
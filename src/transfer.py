@@ -0,0 +1,164 @@
+"""
+This module provides compressed transfer helpers for the requests to the OpenCost API.
+
+Responses are requested with a compressed content encoding, streamed, and decompressed
+chunk by chunk while they are received.
+"""
+
+from io import BytesIO
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+
+FILE_EXTENSIONS = {
+    'gzip': '.gz',
+    'deflate': '.deflate',
+    'zstd': '.zst',
+    'identity': '',
+}
+
+
+def get_accept_encoding(compression):
+    """
+    Returns the Accept-Encoding header for the configured compression.
+
+    Parameters:
+        compression (str): 'auto' (zstd if available, and gzip), 'zstd', 'gzip' or 'none'.
+
+    Returns:
+        str: The value of the Accept-Encoding header.
+
+    Raises:
+        ValueError: If the compression is not supported or zstd is not installed.
+    """
+    if compression == 'auto':
+        return 'zstd, gzip' if zstandard is not None else 'gzip'
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        return 'zstd'
+    if compression == 'gzip':
+        return 'gzip'
+    if compression == 'none':
+        return 'identity'
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+class _IdentityDecompressor:
+    """
+    Decompressor for uncompressed responses.
+    """
+
+    def decompress(self, data):
+        """Returns the data as is."""
+        return data
+
+    def flush(self):
+        """Returns no remaining data."""
+        return b''
+
+
+def get_decompressor(content_encoding):
+    """
+    Returns an incremental decompressor for a response content encoding.
+
+    Parameters:
+        content_encoding (str): Value of the Content-Encoding header.
+
+    Returns:
+        An object with decompress(chunk) and flush() methods.
+
+    Raises:
+        ValueError: If the content encoding is not supported.
+    """
+    if content_encoding == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if content_encoding == 'deflate':
+        return zlib.decompressobj()
+    if content_encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    if content_encoding == 'identity':
+        return _IdentityDecompressor()
+    raise ValueError(f"Unsupported content encoding: {content_encoding}")
+
+
+class RawPayload:
+    """
+    The raw body of a response, as received on the wire, and its content encoding.
+    """
+
+    def __init__(self):
+        self.content_encoding = 'identity'
+        self.buffer = BytesIO()
+
+    def write(self, chunk):
+        """Appends a chunk of the raw body."""
+        self.buffer.write(chunk)
+
+    def file_name(self, name):
+        """
+        Returns a file name for the payload, with the extension of its encoding.
+
+        Parameters:
+            name (str): Base name of the file.
+
+        Returns:
+            str: The file name, e.g. 'name.json.gz'.
+        """
+        return f"{name}.json{FILE_EXTENSIONS.get(self.content_encoding, '')}"
+
+    def getvalue(self):
+        """Returns the raw body."""
+        return self.buffer.getvalue()
+
+
+def read_json_response(response, raw_payload=None):
+    """
+    Streams the body of a response, decompresses it incrementally and parses it as JSON.
+
+    Parameters:
+        response (requests.Response): A response requested with stream=True.
+        raw_payload (RawPayload): If set, receives the raw body of the response.
+
+    Returns:
+        The parsed JSON document.
+    """
+    content_encoding = response.headers.get('content-encoding', 'identity').lower()
+    decompressor = get_decompressor(content_encoding)
+    if raw_payload is not None:
+        raw_payload.content_encoding = content_encoding
+    body = bytearray()
+    for chunk in response.raw.stream(CHUNK_SIZE, decode_content=False):
+        if raw_payload is not None:
+            raw_payload.write(chunk)
+        body += decompressor.decompress(chunk)
+    body += decompressor.flush()
+    return json.loads(body)
+
+
+def decode_payload(data, file_name):
+    """
+    Decompresses and parses a raw payload saved by the export.
+
+    Parameters:
+        data (bytes): The content of the file.
+        file_name (str): Name of the file, whose extension gives the content encoding.
+
+    Returns:
+        The parsed JSON document.
+
+    Raises:
+        ValueError: If the encoding of the file is not supported.
+    """
+    content_encoding = 'identity'
+    for encoding, extension in FILE_EXTENSIONS.items():
+        if extension and file_name.endswith(extension):
+            content_encoding = encoding
+    decompressor = get_decompressor(content_encoding)
+    return json.loads(decompressor.decompress(data) + decompressor.flush())